@@ -4,6 +4,32 @@
 API:
 - GET /api/healthz -> Überprüft den Zustand des Dienstes
 - GET /api/example -> Gibt ein Beispiel-GeoJSON zurück
+- GET /api/admission -> Auslastung & Queue-Wartezeiten je Routenklasse
+- GET /api/startup -> Startup-Report (Import-/Warm-up-Phasen, Time-to-first-200)
+- POST /api/dissolve[?by=<property>] -> Vereinigt überlappende AOIs (gesamt oder je Property-Wert)
+- POST /api/buffer?distance=<m>[,<m>…][&join=round|mitre|bevel][&quad_segs=8][&crs=<CRS>][&dissolve=1]
+    -> Metrischer Puffer (negativ = nach innen) in der AUTO_UTM-Zone, mehrere Distanzen je Aufruf
+- POST /api/cover?grid=xyz&zoom=<z> | ?grid=utm&size=<m>&crs=<AUTO_UTM|EPSG:25832|EPSG:25833>[&split=1]
+    -> Zell-IDs, die die AOIs überdecken (optional getrennt in interior/boundary)
+- POST /api/contains[?index=<hash>][&crs=<EPSG>] -> Feature-Index je Punkt (-1 = außerhalb)
+    Punkte als JSON {"aoi": FC, "points": [[x, y], ...]}, CSV (x,y je Zeile) oder
+    float64-Paare (application/octet-stream); AOI per ?index=<hash> aus dem Cache
+    oder als Multipart-Feld "aoi". Accept: application/octet-stream -> int32-Array.
+- POST /api/topojson?crs=<CRS>[&dissolve=1] -> Kompakter Export: quantisiert, delta-kodiert,
+    gemeinsame Kanten nur einmal (TopoJSON, identisch zum Browser-Export)
+- POST /api/rasterize?crs=<CRS>&res=<m>[&origin=x,y][&format=raw|npy|tiff] -> Binärmaske
+    (1 Bit/Pixel, MSB zuerst, Zeile 0 = Norden), Geotransform in X-Raster-* Headern bzw. im GeoTIFF
+- GET /tiles/<source>/<z>/<x>/<y> -> Caching-Proxy für die Basemaps (osm, esri_sat, esri_ref)
+- GET /api/tiles/stats -> Tile-Cache-Statistik (Treffer, Größe, Evictions)
+- GET /api/cache -> Shared-Memory-Cache (Belegung; Treffer/Misses dieses Workers)
+- GET /sw.js -> Service Worker (App-Shell & Vendor-Libs nach Content-Hash, Kachel-Cache, Seeding)
+- POST /api/jobs -> Asynchroner Export {"aoi": FC, "crs": …, "format": GeoJSON|WKT|EWKT|KML|TopoJSON,
+    "dissolve": bool}; 202 + Job-ID
+- GET /api/jobs/<id> -> Status & Fortschritt (Features/Vertices)
+- GET /api/jobs/<id>/result -> Ergebnis (Range-fähig, sendfile)
+- POST /api/encode -> Kompakter AOI-Code für Permalinks (/#aoi=<code> bzw. /?aoi=<code>)
+- GET /api/decode?aoi=<code>[&format=GeoJSON|WKT|EWKT|KML|TopoJSON][&crs=<CRS>][&dissolve=1][&download=1]
+    -> Export direkt aus dem Code (ohne Datenbank, cachebar)
 """
 """
 AOI Studio – AOI zeichnen & exportieren (GeoJSON / WKT / EWKT / KML)
@@ -16,6 +42,9 @@ Ziel:
   - GeoJSON (FeatureCollection) im gewählten CRS (Default: EPSG:4326)
   - WKT / EWKT im gewählten CRS
   - KML immer EPSG:4326 (WGS84)
+  - TopoJSON (quantisiert auf die Export-Rundung, geteilte Kanten einmal)
+  - Optional: Dissolve (überlappende AOIs vereinigen, serverseitig)
+  - Optional: Puffer in Metern (UTM-Zone nach AOI-Zentrum, serverseitig)
 - CRS:
   - EPSG:4326
   - AUTO_UTM (25832/25833 nach AOI-Zentrum)
@@ -24,17 +53,115 @@ Ziel:
 
 Hinweis:
 - Alles passiert clientseitig. Server speichert nichts.
+- Sitzung: gezeichnete AOIs überleben einen Reload (IndexedDB im Browser,
+  ein Datensatz je Layer, gebündelte Schreibvorgänge).
 - Für Cloud Run geeignet (PORT env).
+- Admission Control: Concurrency-Limit & Queue-Tiefe je Routenklasse
+  (static / health / light / heavy), konfigurierbar via ADMISSION_LIMITS,
+  z.B. "light=8:16,heavy=1:2" (limit:queue), Rest bleibt Default.
+  Überlast -> sofort 503 + Retry-After statt Aufstauen.
+- Cold Start: STARTUP_MODE=eager (Default) rendert Template, komprimiert
+  Assets und führt Warm-ups (numpy/shapely) aus, bevor `python main.py`
+  den Port öffnet. Andere WSGI-Server rufen dafür main.startup() selbst auf
+  (z.B. gunicorn post_worker_init); ein bloßes `import main` bleibt schlank.
+  STARTUP_MODE=lazy verschiebt alles auf den ersten Request.
+- Tile-Proxy: TILE_PROXY=1 lädt die Basemaps über /tiles/… (Disk-Cache mit
+  LRU-Limit, stale-while-revalidate, gebündelte Misses). Upstreams via
+  TILE_UPSTREAMS="osm=https://…/{z}/{x}/{y}.png,esri_sat=…".
+- Offline: Service Worker (SERVICE_WORKER=1, Default) cached App-Shell,
+  Vendor-Libs und besuchte Kacheln (LRU, SW_TILE_QUOTA); Kacheln für eine
+  AOI lassen sich vorab laden. Zeichnen & Export laufen dann offline.
+- Export-Jobs: Prozess-Pool (JOB_WORKERS), Ergebnisse im Spool-Verzeichnis
+  (JOB_SPOOL_DIR) mit TTL (JOB_TTL) und Quota (JOB_SPOOL_MAX_MB).
+- Shared Cache: Dissolve-/TopoJSON-Ergebnisse und Punkt-in-AOI-Indizes liegen
+  nach Content-Hash in einer mmap-Datei (SHARED_CACHE_PATH, SHARED_CACHE_MB),
+  die sich alle Worker-Prozesse teilen (FIFO-Ringpuffer, lock-freies Lesen).
+- CLI: python main.py export [-f FORMAT] [--crs CRS] [-o OUT] [INPUT …]
+  liest GeoJSON/GeoJSONSeq/KML (Datei oder stdin) und schreibt dieselben Bytes
+  wie der Web-Export; Features laufen in Paketen über einen Prozess-Pool.
+- Permalinks: AOI als URL-Code (1e-6°-Raster, Varint-Deltas, deflate, base64url);
+  "/" lädt ?aoi=… bzw. #aoi=… direkt in die Karte. Achtung: ?aoi= läuft durch
+  die Request-Zeile (Proxy-Limits), #aoi= bleibt im Browser.
+- Geometrie-Antworten (GeoJSON) mit fester Präzision wie roundPair
+  (6 Nachkommastellen in EPSG:4326), ?pretty=1 für eingerückte Ausgabe.
 """
 
+import time
+_T0 = time.perf_counter()
+
 import os
-from flask import Flask, Response, jsonify, render_template_string
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")   # eager | lazy
+STARTUP = {"mode": STARTUP_MODE, "phases": [], "import_ms": None, "ready_ms": None, "first_200_ms": None}
+
+@contextmanager
+def startup_phase(name: str):
+  t = time.perf_counter()
+  try:
+    yield
+  finally:
+    ms = (time.perf_counter() - t) * 1000
+    STARTUP["phases"].append({"phase": name, "ms": round(ms, 3)})
+    print(f"[startup] {name}: {ms:.1f} ms", file=sys.stderr, flush=True)
+
+with startup_phase("import:flask"):
+  from flask import Flask, Response, g, jsonify, render_template_string, request
 
 APP_TITLE = os.getenv("APP_TITLE", "AOI Studio – Zeichnen & Export")
 START_LAT = float(os.getenv("START_LAT", "49.8728"))   # Darmstadt default
 START_LON = float(os.getenv("START_LON", "8.6512"))
 START_ZOOM = int(os.getenv("START_ZOOM", "12"))
 
+ADMISSION_DEFAULTS = "static=32:64,health=4:16,light=16:32,heavy=2:4,tiles=32:128"
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "")                        # überschreibt einzelne Klassen
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))   # max. Wartezeit in der Queue (s)
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))        # Retry-After bei 503 (s)
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", "86400"))                      # Preflight-Cache im Browser (s)
+
+TILE_PROXY = os.getenv("TILE_PROXY", "0") in ("1", "true")
+TILE_UPSTREAMS_DEFAULT = {
+  "osm": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+  "esri_sat": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+  "esri_ref": "https://services.arcgisonline.com/ArcGIS/rest/services/Reference/World_Boundaries_and_Places/MapServer/tile/{z}/{y}/{x}",
+}
+TILE_UPSTREAMS = os.getenv("TILE_UPSTREAMS", "")                            # überschreibt einzelne Quellen
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "/tmp/aoi-studio-tiles")
+TILE_CACHE_MAX_MB = int(os.getenv("TILE_CACHE_MAX_MB", "512"))
+TILE_MAX_AGE = int(os.getenv("TILE_MAX_AGE", str(7 * 86400)))              # frisch (s)
+TILE_STALE_MAX = int(os.getenv("TILE_STALE_MAX", str(30 * 86400)))         # stale ausliefern bis (s)
+TILE_TIMEOUT = float(os.getenv("TILE_TIMEOUT", "10"))
+TILE_USER_AGENT = os.getenv("TILE_USER_AGENT", "aoi-studio-tile-proxy/1.0")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "16"))                     # wartende + laufende Jobs
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "/tmp/aoi-studio-jobs")
+JOB_SPOOL_MAX_MB = int(os.getenv("JOB_SPOOL_MAX_MB", "2048"))
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))                                 # fertige Ergebnisse (s)
+JOB_MAX_AGE = int(os.getenv("JOB_MAX_AGE", "21600"))                        # hängende queued/running-Jobs (s)
+
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "/dev/shm/aoi-studio.cache" if os.path.isdir("/dev/shm")
+                              else "/tmp/aoi-studio.cache")
+SHARED_CACHE_MB = int(os.getenv("SHARED_CACHE_MB", "256"))                  # 0 = aus
+SHARED_CACHE_SLOTS = int(os.getenv("SHARED_CACHE_SLOTS", "16384"))
+
+SERVICE_WORKER = os.getenv("SERVICE_WORKER", "1") in ("1", "true")
+SW_TILE_QUOTA = int(os.getenv("SW_TILE_QUOTA", "5000"))                   # max. Kacheln im Browser-Cache
+VENDOR_URLS = [
+  "https://unpkg.com/leaflet@1.9.4/dist/leaflet.css",
+  "https://unpkg.com/leaflet@1.9.4/dist/leaflet.js",
+  "https://unpkg.com/leaflet@1.9.4/dist/images/layers.png",
+  "https://unpkg.com/leaflet@1.9.4/dist/images/layers-2x.png",
+  "https://unpkg.com/leaflet-draw@1.0.4/dist/leaflet.draw.css",
+  "https://unpkg.com/leaflet-draw@1.0.4/dist/leaflet.draw.js",
+  "https://unpkg.com/leaflet-draw@1.0.4/dist/images/spritesheet.png",
+  "https://unpkg.com/leaflet-draw@1.0.4/dist/images/spritesheet-2x.png",
+  "https://unpkg.com/proj4@2.9.2/dist/proj4.js",
+]
+
 INDEX_HTML = r"""<!doctype html>
 <html lang="de">
 <head>
@@ -85,6 +212,8 @@ INDEX_HTML = r"""<!doctype html>
 
         <div class="btn-row">
           <button id="btn-fit" class="btn" disabled>Auf AOI zoomen</button>
+          <button id="btn-link" class="btn" disabled>Link kopieren</button>
+          <button id="btn-seed" class="btn" hidden>Kacheln offline speichern</button>
           <button id="btn-clear" class="btn btn-ghost">Alles löschen</button>
         </div>
 
@@ -119,14 +248,33 @@ INDEX_HTML = r"""<!doctype html>
             <option value="WKT" selected>WKT</option>
             <option value="EWKT">EWKT (SRID=…;WKT)</option>
             <option value="KML">KML (immer EPSG:4326)</option>
+            <option value="TopoJSON">TopoJSON (kompakt, geteilte Kanten)</option>
+          </select>
+        </div>
+
+        <div class="field">
+          <label for="inp-buffer">Puffer (Meter)</label>
+          <input id="inp-buffer" type="number" step="10" placeholder="0" inputmode="decimal" />
+          <select id="sel-buffer-join" aria-label="Ecken des Puffers">
+            <option value="round" selected>Ecken rund</option>
+            <option value="mitre">Ecken spitz (Gehrung)</option>
+            <option value="bevel">Ecken abgeschrägt</option>
           </select>
+          <div class="help">
+            Negativ = nach innen. Gerechnet in der UTM-Zone des AOI-Zentrums, Export im gewählten CRS.
+          </div>
         </div>
+
+        <label class="check" for="chk-dissolve">
+          <input id="chk-dissolve" type="checkbox" />
+          Überlappende AOIs vereinigen (Dissolve)
+        </label>
       </div>
 
       <div class="panel-card">
         <div class="tabs" role="tablist" aria-label="Ausgabe wählen">
           <button id="tab-geo" class="tab is-active" role="tab" aria-selected="true" aria-controls="pane-geo">GeoJSON</button>
-          <button id="tab-alt" class="tab" role="tab" aria-selected="false" aria-controls="pane-alt">WKT/KML</button>
+          <button id="tab-alt" class="tab" role="tab" aria-selected="false" aria-controls="pane-alt">WKT/KML/Topo</button>
         </div>
 
         <section id="pane-geo" class="pane is-active" role="tabpanel" aria-labelledby="tab-geo">
@@ -148,7 +296,7 @@ INDEX_HTML = r"""<!doctype html>
               <button id="btn-alt-copy" class="btn" disabled>Kopieren</button>
             </div>
           </div>
-          <textarea id="out-alt" spellcheck="false" placeholder="Hier erscheint WKT/EWKT/KML …"></textarea>
+          <textarea id="out-alt" spellcheck="false" placeholder="Hier erscheint WKT/EWKT/KML/TopoJSON …"></textarea>
         </section>
       </div>
 
@@ -167,6 +315,8 @@ INDEX_HTML = r"""<!doctype html>
       startLat: {{ start_lat }},
       startLon: {{ start_lon }},
       startZoom: {{ start_zoom }},
+      tileProxy: {{ tile_proxy|tojson }},
+      serviceWorker: {{ service_worker|tojson }},
       title: {{ title|tojson }}
     };
   </script>
@@ -384,11 +534,32 @@ select{
 @media (prefers-color-scheme: dark){
   select{ background: rgba(255,255,255,.06); }
 }
-select:focus{
+.field input{
+  border: 1px solid var(--border);
+  background: rgba(255,255,255,.7);
+  color: var(--text);
+  padding: 10px 12px;
+  border-radius: 12px;
+  font-weight: 650;
+}
+@media (prefers-color-scheme: dark){
+  .field input{ background: rgba(255,255,255,.06); }
+}
+select:focus, .field input:focus{
+  outline: none;
   border-color: rgba(37,99,235,.55);
   box-shadow: 0 0 0 4px var(--primary-weak);
 }
 
+.check{
+  display:flex;
+  align-items:center;
+  gap: 8px;
+  margin-top: 12px;
+  cursor: pointer;
+}
+.check input{ margin: 0; accent-color: var(--primary); }
+
 .help{
   font-size: 12px;
   color: var(--muted);
@@ -522,10 +693,15 @@ APP_JS = r"""
   const elToast = $("toast");
 
   const btnFit = $("btn-fit");
+  const btnLink = $("btn-link");
   const btnClear = $("btn-clear");
+  const btnSeed = $("btn-seed");
 
   const selCrs = $("sel-crs");
   const selFormat = $("sel-format");
+  const chkDissolve = $("chk-dissolve");
+  const inpBuffer = $("inp-buffer");
+  const selBufferJoin = $("sel-buffer-join");
 
   const tabGeo = $("tab-geo");
   const tabAlt = $("tab-alt");
@@ -577,20 +753,27 @@ APP_JS = r"""
   // ---- Map
   const map = L.map("map", { preferCanvas: true }).setView([CFG.startLat, CFG.startLon], CFG.startZoom);
 
-  const osm = L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
+  // CFG.tileProxy: tiles via the server's caching proxy (/tiles/<source>/…)
+  const TILE_URLS = CFG.tileProxy ? {
+    osm: "/tiles/osm/{z}/{x}/{y}",
+    esriSat: "/tiles/esri_sat/{z}/{x}/{y}",
+    esriRef: "/tiles/esri_ref/{z}/{x}/{y}"
+  } : {
+    osm: "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png",
+    esriSat: "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+    esriRef: "https://services.arcgisonline.com/ArcGIS/rest/services/Reference/World_Boundaries_and_Places/MapServer/tile/{z}/{y}/{x}"
+  };
+
+  // crossOrigin: CORS responses, so the service worker can cache tiles without opaque padding
+  const osm = L.tileLayer(TILE_URLS.osm, {
     maxZoom: 20,
+    crossOrigin: true,
     attribution: "&copy; OpenStreetMap"
   });
 
-  const esriSat = L.tileLayer(
-    "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
-    { maxZoom: 20, attribution: "Tiles &copy; Esri" }
-  );
+  const esriSat = L.tileLayer(TILE_URLS.esriSat, { maxZoom: 20, crossOrigin: true, attribution: "Tiles &copy; Esri" });
 
-  const esriRef = L.tileLayer(
-    "https://services.arcgisonline.com/ArcGIS/rest/services/Reference/World_Boundaries_and_Places/MapServer/tile/{z}/{y}/{x}",
-    { maxZoom: 20, attribution: "Labels &copy; Esri" }
-  );
+  const esriRef = L.tileLayer(TILE_URLS.esriRef, { maxZoom: 20, crossOrigin: true, attribution: "Labels &copy; Esri" });
 
   osm.addTo(map);
   L.control.layers({ "OSM": osm, "Satellit": esriSat }, { "Satellit Labels": esriRef }, { collapsed: true }).addTo(map);
@@ -771,6 +954,140 @@ APP_JS = r"""
       `</Document></kml>`;
   }
 
+  // ---- TopoJSON (quantized to the export rounding, shared arcs stored once, delta-encoded)
+  function fcToTopoJSON(fc, epsg) {
+    const k = (epsg === "EPSG:4326") ? 1e6 : 1e2;
+    const ptKey = (p) => p[0] + "," + p[1];
+
+    function quantRing(ring) {
+      const out = [];
+      for (const pt of ring) {
+        const q = [Math.round(pt[0] * k), Math.round(pt[1] * k)];
+        const last = out[out.length - 1];
+        if (last && last[0] === q[0] && last[1] === q[1]) continue;
+        out.push(q);
+      }
+      if (out.length > 1 && ptKey(out[0]) === ptKey(out[out.length - 1])) out.pop();
+      return out;
+    }
+
+    // geometries -> polygons -> quantized open rings
+    const items = [];
+    let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+    for (const f of (fc.features || [])) {
+      const g = f.geometry;
+      if (!g || (g.type !== "Polygon" && g.type !== "MultiPolygon")) continue;
+      const polys = (g.type === "Polygon") ? [g.coordinates || []] : (g.coordinates || []);
+      const qpolys = polys.map(poly => (poly || []).map(quantRing).filter(r => r.length >= 3));
+      for (const poly of qpolys) for (const ring of poly) for (const p of ring) {
+        if (p[0] < minX) minX = p[0];
+        if (p[1] < minY) minY = p[1];
+        if (p[0] > maxX) maxX = p[0];
+        if (p[1] > maxY) maxY = p[1];
+      }
+      items.push({ type: g.type, polys: qpolys, properties: f.properties || {} });
+    }
+    if (!isFinite(minX)) minX = minY = maxX = maxY = 0;
+
+    // junctions: points whose neighbours differ between occurrences
+    const seen = new Map();
+    const junctions = new Set();
+    for (const it of items) for (const poly of it.polys) for (const ring of poly) {
+      const n = ring.length;
+      for (let i = 0; i < n; i++) {
+        const key = ptKey(ring[i]);
+        const prev = ptKey(ring[(i + n - 1) % n]);
+        const next = ptKey(ring[(i + 1) % n]);
+        const s = seen.get(key);
+        if (!s) seen.set(key, [prev, next]);
+        else if (!((s[0] === prev && s[1] === next) || (s[0] === next && s[1] === prev))) junctions.add(key);
+      }
+    }
+
+    const arcs = [];
+    const arcIds = new Map();
+    function arcIndex(arc) {
+      const fwd = arc.map(ptKey).join(";");
+      if (arcIds.has(fwd)) return arcIds.get(fwd);
+      const rev = arc.slice().reverse().map(ptKey).join(";");
+      if (arcIds.has(rev)) return ~arcIds.get(rev);
+      arcIds.set(fwd, arcs.length);
+      arcs.push(arc);
+      return arcs.length - 1;
+    }
+
+    function ringArcs(ring) {
+      const n = ring.length;
+      let start = -1;
+      for (let i = 0; i < n; i++) if (junctions.has(ptKey(ring[i]))) { start = i; break; }
+      if (start < 0) {
+        // closed ring without junctions: canonical start at the smallest point
+        let m = 0;
+        for (let i = 1; i < n; i++) {
+          if (ring[i][0] < ring[m][0] || (ring[i][0] === ring[m][0] && ring[i][1] < ring[m][1])) m = i;
+        }
+        return [arcIndex(ring.slice(m).concat(ring.slice(0, m), [ring[m]]))];
+      }
+      const out = [];
+      let cur = [ring[start]];
+      for (let j = 1; j <= n; j++) {
+        const p = ring[(start + j) % n];
+        cur.push(p);
+        if (junctions.has(ptKey(p))) { out.push(arcIndex(cur)); cur = [p]; }
+      }
+      return out;
+    }
+
+    const geometries = items.map(it => {
+      const polyArcs = it.polys.map(poly => poly.map(ringArcs));
+      return {
+        type: it.type,
+        arcs: (it.type === "Polygon") ? polyArcs[0] : polyArcs,
+        properties: it.properties
+      };
+    });
+
+    const encoded = arcs.map(arc => arc.map((p, i) => (i === 0)
+      ? [p[0] - minX, p[1] - minY]
+      : [p[0] - arc[i - 1][0], p[1] - arc[i - 1][1]]));
+
+    return {
+      type: "Topology",
+      bbox: [minX / k, minY / k, maxX / k, maxY / k],
+      transform: { scale: [1 / k, 1 / k], translate: [minX / k, minY / k] },
+      objects: { aoi: { type: "GeometryCollection", geometries } },
+      arcs: encoded
+    };
+  }
+
+  // ---- Server operations
+  async function postJSON(url, body) {
+    const res = await fetch(url, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body)
+    });
+    const data = await res.json().catch(() => null);
+    if (!res.ok) throw new Error((data && data.error) || `HTTP ${res.status}`);
+    return data;
+  }
+
+  function dissolveFC(fc4326) {
+    return postJSON("/api/dissolve", fc4326);
+  }
+
+  function bufferMeters() {
+    const m = Number(inpBuffer.value);
+    return Number.isFinite(m) ? m : 0;
+  }
+
+  function bufferFC(fc4326, meters) {
+    // dissolve runs server-side before buffering (one request instead of two)
+    const q = new URLSearchParams({ distance: String(meters), join: selBufferJoin.value });
+    if (chkDissolve.checked) q.set("dissolve", "1");
+    return postJSON(`/api/buffer?${q}`, fc4326);
+  }
+
   // ---- Tabs
   function setTab(which) {
     const geo = (which === "geo");
@@ -804,10 +1121,288 @@ APP_JS = r"""
 
   function clearAll() {
     drawn.clearLayers();
+    persistClear();
     updateAll();
     toast("Alles gelöscht.");
   }
 
+  // ---- Permalink (#aoi=…), same format as encode_aoi/decode_aoi on the server:
+  // varints (version, #features, polygons/feature, rings/polygon, points/ring without
+  // the closing point), then zigzag deltas of x/y on a 1e-6° grid; deflate-raw, base64url
+  const AOI_CODE_VERSION = 1;
+  const AOI_CODE_Q = 1e6;
+
+  function aoiPolygons(g) {
+    if (!g) return [];
+    if (g.type === "Polygon") return [g.coordinates || []];
+    if (g.type === "MultiPolygon") return g.coordinates || [];
+    return [];
+  }
+
+  async function pipeBytes(bytes, stream) {
+    return new Uint8Array(await new Response(new Blob([bytes]).stream().pipeThrough(stream)).arrayBuffer());
+  }
+
+  function toBase64Url(bytes) {
+    let s = "";
+    for (let i = 0; i < bytes.length; i += 0x8000) s += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    return btoa(s).replace(/\+/g, "-").replace(/\//g, "_").replace(/=+$/, "");
+  }
+
+  function fromBase64Url(code) {
+    const s = atob(code.replace(/-/g, "+").replace(/_/g, "/") + "=".repeat((4 - code.length % 4) % 4));
+    const out = new Uint8Array(s.length);
+    for (let i = 0; i < s.length; i++) out[i] = s.charCodeAt(i);
+    return out;
+  }
+
+  async function encodeAoi(fc) {
+    if (typeof CompressionStream === "undefined") throw new Error("Browser ohne CompressionStream");
+    const polyCounts = [], ringCounts = [], pointCounts = [], deltas = [];
+    let px = 0, py = 0;
+    for (const f of fc.features) {
+      // polygons without a usable shell are dropped (as in flatten_polygons)
+      const polys = aoiPolygons(f && f.geometry).filter(p => p && p[0] && p[0].length >= 3);
+      if (!polys.length) continue;
+      polyCounts.push(polys.length);
+      for (const poly of polys) {
+        const rings = poly.filter(r => r && r.length >= 3);
+        ringCounts.push(rings.length);
+        for (const ring of rings) {
+          let n = ring.length;
+          const q = ring.map(c => [Math.floor(c[0] * AOI_CODE_Q + 0.5), Math.floor(c[1] * AOI_CODE_Q + 0.5)]);
+          if (q[0][0] === q[n - 1][0] && q[0][1] === q[n - 1][1]) n--;
+          pointCounts.push(n);
+          for (let i = 0; i < n; i++) {
+            const dx = q[i][0] - px, dy = q[i][1] - py;
+            deltas.push(dx >= 0 ? 2 * dx : -2 * dx - 1, dy >= 0 ? 2 * dy : -2 * dy - 1);
+            px = q[i][0];
+            py = q[i][1];
+          }
+        }
+      }
+    }
+    const values = [AOI_CODE_VERSION, polyCounts.length, ...polyCounts, ...ringCounts, ...pointCounts];
+    const out = new Uint8Array((values.length + deltas.length) * 8);
+    let p = 0;
+    for (const list of [values, deltas]) {
+      for (let v of list) {
+        while (v >= 128) { out[p++] = (v % 128) | 128; v = Math.floor(v / 128); }
+        out[p++] = v;
+      }
+    }
+    return toBase64Url(await pipeBytes(out.subarray(0, p), new CompressionStream("deflate-raw")));
+  }
+
+  async function decodeAoi(code) {
+    if (typeof DecompressionStream === "undefined") throw new Error("Browser ohne DecompressionStream");
+    const raw = await pipeBytes(fromBase64Url(code), new DecompressionStream("deflate-raw"));
+    let p = 0;
+    const next = () => {
+      let v = 0, mul = 1, b;
+      do {
+        if (p >= raw.length) throw new Error("AOI-Code abgeschnitten");
+        b = raw[p++];
+        v += (b & 127) * mul;
+        mul *= 128;
+      } while (b & 128);
+      return v;
+    };
+    const take = (n) => { const a = []; for (let i = 0; i < n; i++) a.push(next()); return a; };
+    const sum = (a) => a.reduce((s, v) => s + v, 0);
+    const unzig = (z) => (z % 2) ? -(z + 1) / 2 : z / 2;
+
+    if (next() !== AOI_CODE_VERSION) throw new Error("AOI-Code: unbekannte Version");
+    const polyCounts = take(next());
+    const ringCounts = take(sum(polyCounts));
+    const pointCounts = take(sum(ringCounts));
+    const features = [];
+    let x = 0, y = 0, pi = 0, ri = 0;
+    for (const nPoly of polyCounts) {
+      const coords = [];
+      for (let k = 0; k < nPoly; k++) {
+        const poly = [];
+        for (let j = 0, nr = ringCounts[pi++]; j < nr; j++) {
+          const ring = [];
+          for (let i = 0, n = pointCounts[ri++]; i < n; i++) {
+            x += unzig(next());
+            y += unzig(next());
+            ring.push([x / AOI_CODE_Q, y / AOI_CODE_Q]);
+          }
+          if (ring.length) ring.push(ring[0].slice());
+          poly.push(ring);
+        }
+        coords.push(poly);
+      }
+      const geometry = (coords.length === 1)
+        ? { type: "Polygon", coordinates: coords[0] }
+        : { type: "MultiPolygon", coordinates: coords };
+      features.push({ type: "Feature", properties: {}, geometry });
+    }
+    if (p !== raw.length) throw new Error("AOI-Code: überzählige Bytes");
+    return { type: "FeatureCollection", features };
+  }
+
+  async function loadPermalink() {
+    const hashCode = new URLSearchParams(location.hash.slice(1)).get("aoi");
+    const queryCode = new URLSearchParams(location.search).get("aoi");
+    try {
+      // ?aoi= is already decoded by the server (CFG.aoi) unless the page came from the offline shell
+      const fc = hashCode ? await decodeAoi(hashCode) : (CFG.aoi || (queryCode ? await decodeAoi(queryCode) : null));
+      if (fc) {
+        L.geoJSON(fc).eachLayer((layer) => drawn.addLayer(layer));
+        zoomToAOI();
+        toast("AOI aus Link geladen.");
+      }
+    } catch (e) {
+      toast(`AOI-Link nicht lesbar (${e?.message || String(e)}).`);
+    }
+    updateAll();
+  }
+
+  // ---- Session persistence (IndexedDB): one record per layer, keyed by layer id.
+  // Writes are queued per layer and flushed in one transaction when the browser is
+  // idle; "bounds" holds only the bbox so a reload can frame the map before the
+  // geometries are read. Pages opened from a permalink neither restore nor write.
+  const SESSION_DB = "aoi-studio";
+  const SESSION_FLUSH_MS = 400;
+  const SESSION_RESTORE_PAGE = 200;
+  const SESSION_ID = Date.now().toString(36);
+  const sessionPersist = !/(^|[#?&])aoi=/.test(location.hash + location.search);
+  const sessionPending = new Map();   // key -> layer (put) or null (delete)
+  let sessionClear = false;
+  let sessionEpoch = 0;               // bumped by "Alles löschen", stops a running restore
+  let sessionTimer = null;
+  let sessionDbPromise = null;
+
+  function idbRequest(req) {
+    return new Promise((resolve, reject) => {
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+
+  function sessionDb() {
+    if (!sessionDbPromise) {
+      sessionDbPromise = new Promise((resolve, reject) => {
+        if (!window.indexedDB) throw new Error("IndexedDB nicht verfügbar");
+        const req = indexedDB.open(SESSION_DB, 1);
+        req.onupgradeneeded = () => {
+          req.result.createObjectStore("layers", { keyPath: "id" });
+          req.result.createObjectStore("bounds", { keyPath: "id" });
+        };
+        idbRequest(req).then(resolve, reject);
+      });
+    }
+    return sessionDbPromise;
+  }
+
+  function layerKey(layer) {
+    // session prefix: layer ids restart at every page load, restored layers keep their key
+    if (!layer.aoiKey) layer.aoiKey = `${SESSION_ID}:${String(L.stamp(layer)).padStart(8, "0")}`;
+    return layer.aoiKey;
+  }
+
+  function persistLayers(layers, remove) {
+    if (!sessionPersist) return;
+    for (const layer of layers) sessionPending.set(layerKey(layer), remove ? null : layer);
+    scheduleFlush();
+  }
+
+  function persistClear() {
+    if (!sessionPersist) return;
+    sessionPending.clear();
+    sessionClear = true;
+    sessionEpoch++;
+    scheduleFlush();
+  }
+
+  function scheduleFlush() {
+    clearTimeout(sessionTimer);
+    sessionTimer = setTimeout(() => {
+      if (window.requestIdleCallback) requestIdleCallback(flushSession, { timeout: 2000 });
+      else flushSession();
+    }, SESSION_FLUSH_MS);
+  }
+
+  async function flushSession() {
+    clearTimeout(sessionTimer);
+    if (!sessionClear && !sessionPending.size) return;
+    const clear = sessionClear;
+    const batch = Array.from(sessionPending);
+    sessionClear = false;
+    sessionPending.clear();
+    // serialize the latest state of each layer; edits inside the debounce window coalesce
+    const rows = batch.map(([id, layer]) => {
+      if (!layer) return { id };
+      const b = layer.getBounds();
+      return { id, geometry: layer.toGeoJSON().geometry, bbox: [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()] };
+    });
+    try {
+      const db = await sessionDb();
+      const tx = db.transaction(["layers", "bounds"], "readwrite", { durability: "relaxed" });
+      const layers = tx.objectStore("layers");
+      const bounds = tx.objectStore("bounds");
+      if (clear) {
+        layers.clear();
+        bounds.clear();
+      }
+      for (const r of rows) {
+        if (r.geometry) {
+          layers.put({ id: r.id, geometry: r.geometry });
+          bounds.put({ id: r.id, bbox: r.bbox });
+        } else {
+          layers.delete(r.id);
+          bounds.delete(r.id);
+        }
+      }
+    } catch {
+      // best effort: the session simply isn't saved (private mode, quota)
+    }
+  }
+
+  async function restoreSession() {
+    const epoch = sessionEpoch;
+    let n = 0;
+    try {
+      const db = await sessionDb();
+      const boxes = await idbRequest(db.transaction("bounds").objectStore("bounds").getAll());
+      if (boxes.length) {
+        // bounds first: frame the map and report the count before any geometry is read
+        const b = L.latLngBounds([]);
+        for (const r of boxes) b.extend([[r.bbox[1], r.bbox[0]], [r.bbox[3], r.bbox[2]]]);
+        if (b.isValid()) map.fitBounds(b.pad(0.15));
+        setStatus("idle", `Stelle <b>${boxes.length}</b> AOI${boxes.length === 1 ? "" : "s"} der letzten Sitzung wieder her …`);
+
+        // geometries in key order, page by page, yielding to drawing in between
+        let last = null;
+        for (;;) {
+          const range = (last === null) ? null : IDBKeyRange.lowerBound(last, true);
+          const recs = await idbRequest(db.transaction("layers").objectStore("layers").getAll(range, SESSION_RESTORE_PAGE));
+          if (!recs.length || epoch !== sessionEpoch) break;
+          for (const r of recs) {
+            L.geoJSON(r.geometry).eachLayer((layer) => {
+              layer.aoiKey = r.id;
+              drawn.addLayer(layer);
+            });
+          }
+          n += recs.length;
+          last = recs[recs.length - 1].id;
+          await new Promise((resolve) => setTimeout(resolve, 0));
+        }
+      }
+    } catch {
+      // no IndexedDB: start empty
+    }
+    updateAll();
+    if (n) toast(`${n} AOI${n === 1 ? "" : "s"} wiederhergestellt.`);
+  }
+
+  if (sessionPersist) {
+    addEventListener("pagehide", flushSession);
+    document.addEventListener("visibilitychange", () => { if (document.hidden) flushSession(); });
+  }
+
   // ---- Main state
   let currentFc4326 = null;
   let currentFcExport = null;
@@ -851,6 +1446,14 @@ APP_JS = r"""
       return;
     }
 
+    if (fmt === "TopoJSON") {
+      outAlt.value = JSON.stringify(fcToTopoJSON(currentFcExport || currentFc4326, currentExportEpsg));
+      lblAlt.textContent = `TopoJSON – Export ${currentExportEpsg}`;
+      btnAltDl.disabled = false;
+      btnAltCopy.disabled = false;
+      return;
+    }
+
     const wkt = fcToWkt(currentFcExport || currentFc4326);
     if (!wkt) {
       outAlt.value = "";
@@ -873,8 +1476,30 @@ APP_JS = r"""
     btnAltCopy.disabled = false;
   }
 
+  let updateSeq = 0;
+
   function updateAll() {
-    const { fc4326, center, sel, epsgUsed } = resolveExportEpsg();
+    const seq = ++updateSeq;
+    const state = resolveExportEpsg();
+    const meters = bufferMeters();
+    if ((!chkDissolve.checked && !meters) || !state.fc4326.features.length) {
+      renderAll(state);
+      return;
+    }
+    (meters ? bufferFC(state.fc4326, meters) : dissolveFC(state.fc4326))
+      .then((fc) => {
+        if (seq !== updateSeq) return;
+        renderAll(Object.assign({}, state, { fc4326: fc }));
+      })
+      .catch((e) => {
+        if (seq !== updateSeq) return;
+        renderAll(state);
+        const what = meters ? "Puffer fehlgeschlagen, Export ohne Puffer" : "Dissolve fehlgeschlagen, Export ohne Vereinigung";
+        setStatus("err", `${what}. <span style="opacity:.9">(${escapeHtml(e?.message || String(e))})</span>`);
+      });
+  }
+
+  function renderAll({ fc4326, center, sel, epsgUsed }) {
     const n = fc4326.features.length;
 
     currentFc4326 = fc4326;
@@ -888,6 +1513,7 @@ APP_JS = r"""
       lblAlt.textContent = "WKT";
 
       btnFit.disabled = true;
+      btnLink.disabled = true;
       btnGeoDl.disabled = true;
       btnGeoCopy.disabled = true;
       btnAltDl.disabled = true;
@@ -916,6 +1542,7 @@ APP_JS = r"""
     lblGeo.textContent = `GeoJSON (Export ${used})`;
 
     btnFit.disabled = false;
+    btnLink.disabled = false;
     btnGeoDl.disabled = false;
     btnGeoCopy.disabled = false;
 
@@ -932,19 +1559,36 @@ APP_JS = r"""
   // ---- Events (Leaflet.Draw)
   map.on(L.Draw.Event.CREATED, (e) => {
     drawn.addLayer(e.layer);
+    persistLayers([e.layer]);
     updateAll();
     toast("AOI hinzugefügt.");
   });
 
-  map.on("draw:edited", () => { updateAll(); toast("AOI aktualisiert."); });
-  map.on("draw:deleted", () => { updateAll(); toast("AOI gelöscht."); });
+  map.on("draw:edited", (e) => { persistLayers(e.layers.getLayers()); updateAll(); toast("AOI aktualisiert."); });
+  map.on("draw:deleted", (e) => { persistLayers(e.layers.getLayers(), true); updateAll(); toast("AOI gelöscht."); });
 
   // ---- Buttons
   btnFit.addEventListener("click", zoomToAOI);
   btnClear.addEventListener("click", clearAll);
+  btnLink.addEventListener("click", async () => {
+    const fc = buildFC4326();
+    if (!fc.features.length) return;
+    try {
+      const code = await encodeAoi(fc);
+      const url = `${location.origin}${location.pathname}#aoi=${code}`;
+      history.replaceState(null, "", url);
+      await navigator.clipboard.writeText(url);
+      toast(`Link kopiert (${code.length} Zeichen).`);
+    } catch (e) {
+      toast(`Link fehlgeschlagen (${e?.message || String(e)}).`);
+    }
+  });
 
   selCrs.addEventListener("change", () => { updateAll(); toast("Export CRS geändert."); });
   selFormat.addEventListener("change", () => { updateAltOutput(); toast("Format geändert."); });
+  chkDissolve.addEventListener("change", () => { updateAll(); toast(chkDissolve.checked ? "Dissolve aktiv." : "Dissolve aus."); });
+  inpBuffer.addEventListener("change", () => { updateAll(); toast(bufferMeters() ? `Puffer ${bufferMeters()} m.` : "Puffer aus."); });
+  selBufferJoin.addEventListener("change", () => { if (bufferMeters()) updateAll(); });
 
   btnGeoDl.addEventListener("click", () => {
     const txt = outGeo.value || "";
@@ -973,6 +1617,7 @@ APP_JS = r"""
     const code = (currentExportEpsg.split(":")[1] || "4326");
 
     if (fmt === "KML") downloadText("aoi.kml", txt, "application/vnd.google-earth.kml+xml;charset=utf-8");
+    else if (fmt === "TopoJSON") downloadText(`aoi_epsg${code}.topojson`, txt, "application/json;charset=utf-8");
     else if (fmt === "EWKT") downloadText(`aoi_epsg${code}.ewkt.txt`, txt, "text/plain;charset=utf-8");
     else downloadText(`aoi_epsg${code}.wkt.txt`, txt, "text/plain;charset=utf-8");
 
@@ -990,47 +1635,567 @@ APP_JS = r"""
     }
   });
 
+  // ---- Service worker (offline shell, tile cache, seeding)
+  const SEED_MAX_TILES = 1500;
+
+  function seedTileUrls(bounds, zoom) {
+    const layers = [osm, esriSat, esriRef].filter(l => map.hasLayer(l));
+    const urls = [];
+    for (let z = zoom; z <= Math.min(zoom + 3, 18); z++) {
+      const nw = map.project(bounds.getNorthWest(), z).divideBy(256).floor();
+      const se = map.project(bounds.getSouthEast(), z).divideBy(256).floor();
+      const n = (se.x - nw.x + 1) * (se.y - nw.y + 1) * layers.length;
+      if (urls.length && urls.length + n > SEED_MAX_TILES) break;
+      for (let x = nw.x; x <= se.x; x++) {
+        for (let y = nw.y; y <= se.y; y++) {
+          const c = L.point(x, y);
+          c.z = z;
+          for (const l of layers) {
+            urls.push(L.Util.template(l._url, L.extend({
+              s: l._getSubdomain(c), x, y, z, r: (l.options.detectRetina && L.Browser.retina) ? "@2x" : ""
+            }, l.options)));
+          }
+        }
+      }
+    }
+    return urls.slice(0, SEED_MAX_TILES);
+  }
+
+  if (CFG.serviceWorker && "serviceWorker" in navigator) {
+    navigator.serviceWorker.register("/sw.js").then(() => { btnSeed.hidden = false; }).catch(() => {});
+
+    navigator.serviceWorker.addEventListener("message", (e) => {
+      const msg = e.data || {};
+      if (msg.type !== "seed-progress") return;
+      if (msg.done < msg.total) toast(`Kacheln offline: ${msg.done}/${msg.total} …`);
+      else toast(`Kacheln offline gespeichert: ${msg.total - msg.failed}/${msg.total}.`);
+    });
+
+    btnSeed.addEventListener("click", async () => {
+      const aoi = drawn.getBounds();
+      const bounds = (aoi && aoi.isValid()) ? aoi.pad(0.1) : map.getBounds();
+      const urls = seedTileUrls(bounds, map.getZoom());
+      const reg = await navigator.serviceWorker.ready;
+      if (!reg.active) return;
+      reg.active.postMessage({ type: "seed", urls });
+      toast(`Lade ${urls.length} Kacheln für offline …`);
+    });
+  }
+
   // ---- init
-  updateAll();
+  if (sessionPersist) restoreSession();
+  else loadPermalink();
 })();
 """
 
-app = Flask(__name__)
-app.config["JSON_SORT_KEYS"] = False
-app.config["JSON_AS_ASCII"] = False
+SW_JS = r"""
+// AOI Studio service worker: app shell + vendor libs (content-hashed), LRU tile cache, tile seeding
+const VERSION = __VERSION__;
+const SHELL = __SHELL__;
+const VENDOR = __VENDOR__;
+const TILE_QUOTA = __TILE_QUOTA__;
+const TILE_HOSTS = __TILE_HOSTS__;
+const SHELL_CACHE = `aoi-shell-${VERSION}`;
+const TILE_CACHE = "aoi-tiles";
+
+self.addEventListener("install", (e) => {
+  e.waitUntil((async () => {
+    const cache = await caches.open(SHELL_CACHE);
+    await cache.addAll(SHELL);
+    await Promise.all(VENDOR.map(u =>
+      cache.add(new Request(u, { mode: "cors", credentials: "omit" })).catch(() => {})));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener("activate", (e) => {
+  e.waitUntil((async () => {
+    for (const name of await caches.keys()) {
+      if (name.startsWith("aoi-shell-") && name !== SHELL_CACHE) await caches.delete(name);
+    }
+    await self.clients.claim();
+  })());
+});
+
+function isTile(url) {
+  return url.pathname.startsWith("/tiles/") && url.origin === self.location.origin
+    || TILE_HOSTS.some(h => url.hostname === h || url.hostname.endsWith("." + h));
+}
+
+self.addEventListener("fetch", (e) => {
+  const req = e.request;
+  if (req.method !== "GET") return;
+  const url = new URL(req.url);
+
+  if (isTile(url)) {
+    e.respondWith(tileResponse(req, e));
+    return;
+  }
+  if (req.mode === "navigate" && url.origin === self.location.origin && url.pathname === "/") {
+    // plain "/" from the shell; with query (state in the URL) network first
+    e.respondWith(url.search
+      ? fetch(req).catch(() => caches.match("/", { cacheName: SHELL_CACHE }))
+      : caches.match("/", { cacheName: SHELL_CACHE }).then(hit => hit || fetch(req)));
+    return;
+  }
+  if (SHELL.includes(url.pathname) && url.origin === self.location.origin || VENDOR.includes(req.url)) {
+    e.respondWith(caches.match(req.url, { cacheName: SHELL_CACHE }).then(hit => hit || fetch(req)));
+  }
+});
+
+// ---- Tile LRU bookkeeping (IndexedDB: url -> last access)
+let dbPromise = null;
+function db() {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve, reject) => {
+      const r = indexedDB.open("aoi-sw", 1);
+      r.onupgradeneeded = () => r.result.createObjectStore("tiles", { keyPath: "url" }).createIndex("ts", "ts");
+      r.onsuccess = () => resolve(r.result);
+      r.onerror = () => reject(r.error);
+    });
+  }
+  return dbPromise;
+}
+
+function txDone(tx) {
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = tx.onabort = () => reject(tx.error);
+  });
+}
+
+const touched = new Map();
+let flushing = null;
+
+function touch(url) {
+  touched.set(url, Date.now());
+  if (!flushing) {
+    flushing = new Promise(r => setTimeout(r, 1000)).then(flushTouches).finally(() => { flushing = null; });
+  }
+  return flushing;
+}
+
+async function flushTouches() {
+  if (!touched.size) return;
+  const batch = [...touched];
+  touched.clear();
+  const d = await db();
+  const tx = d.transaction("tiles", "readwrite");
+  const store = tx.objectStore("tiles");
+  for (const [url, ts] of batch) store.put({ url, ts });
+  await txDone(tx);
+  await trimTiles();
+}
+
+async function trimTiles() {
+  const d = await db();
+  const count = await new Promise((resolve) => {
+    const r = d.transaction("tiles").objectStore("tiles").count();
+    r.onsuccess = () => resolve(r.result);
+    r.onerror = () => resolve(0);
+  });
+  let excess = count - TILE_QUOTA;
+  if (excess <= 0) return;
+  const victims = [];
+  const tx = d.transaction("tiles", "readwrite");
+  const cur = tx.objectStore("tiles").index("ts").openCursor();
+  cur.onsuccess = () => {
+    const c = cur.result;
+    if (!c || excess-- <= 0) return;
+    victims.push(c.value.url);
+    c.delete();
+    c.continue();
+  };
+  await txDone(tx);
+  const cache = await caches.open(TILE_CACHE);
+  await Promise.all(victims.map(u => cache.delete(u)));
+}
+
+async function tileResponse(req, event) {
+  const cache = await caches.open(TILE_CACHE);
+  const hit = await cache.match(req.url);
+  if (hit) {
+    event.waitUntil(touch(req.url));
+    return hit;
+  }
+  try {
+    const res = await fetch(req);
+    if (res.ok && res.type !== "opaque") {
+      event.waitUntil(cache.put(req.url, res.clone()).then(() => touch(req.url)));
+    }
+    return res;
+  } catch {
+    return new Response("", { status: 504, statusText: "offline" });
+  }
+}
+
+// ---- Seeding: page posts { type: "seed", urls: [...] }
+self.addEventListener("message", (e) => {
+  const msg = e.data || {};
+  if (msg.type === "seed") e.waitUntil(seed(msg.urls || [], e.source));
+});
+
+async function seed(urls, client) {
+  const cache = await caches.open(TILE_CACHE);
+  const queue = urls.slice();
+  const total = urls.length;
+  let done = 0, failed = 0;
+  const report = () => client && client.postMessage({ type: "seed-progress", done, failed, total });
+
+  async function worker() {
+    while (queue.length) {
+      const u = queue.shift();
+      try {
+        if (!(await cache.match(u))) {
+          const res = await fetch(u, { mode: "cors", credentials: "omit" });
+          if (!res.ok) throw new Error(String(res.status));
+          await cache.put(u, res);
+        }
+        touched.set(u, Date.now());
+      } catch {
+        failed += 1;
+      }
+      done += 1;
+      if (done % 25 === 0) report();
+    }
+  }
+  await Promise.all(Array.from({ length: 6 }, worker));
+  await flushTouches();
+  report();
+}
+"""
+
+# ---- Admission control
+class AdmissionGate:
+  """Concurrency-Limit + begrenzte Warteschlange für eine Routenklasse."""
+
+  def __init__(self, name: str, limit: int, queue: int):
+    self.name = name
+    self.limit = max(1, limit)
+    self.queue = max(0, queue)
+    self._cv = threading.Condition()
+    self.active = 0
+    self.waiting = 0
+    self.admitted = 0
+    self.rejected = 0
+    self.timeouts = 0
+    self.wait_total = 0.0
+    self.wait_max = 0.0
+
+  def acquire(self, timeout: float):
+    """Gibt die Wartezeit (s) zurück oder None, wenn abgewiesen."""
+    t0 = time.perf_counter()
+    with self._cv:
+      if self.active >= self.limit:
+        if self.waiting >= self.queue:
+          self.rejected += 1
+          return None
+        self.waiting += 1
+        try:
+          ok = self._cv.wait_for(lambda: self.active < self.limit, timeout)
+        finally:
+          self.waiting -= 1
+        if not ok:
+          self.timeouts += 1
+          return None
+      self.active += 1
+      waited = time.perf_counter() - t0
+      self.admitted += 1
+      self.wait_total += waited
+      self.wait_max = max(self.wait_max, waited)
+      return waited
+
+  def release(self) -> None:
+    with self._cv:
+      self.active -= 1
+      self._cv.notify()
+
+  def stats(self) -> dict:
+    with self._cv:
+      return {
+        "limit": self.limit,
+        "queue": self.queue,
+        "active": self.active,
+        "waiting": self.waiting,
+        "admitted": self.admitted,
+        "rejected": self.rejected,
+        "timeouts": self.timeouts,
+        "wait_avg_ms": round(1000 * self.wait_total / self.admitted, 3) if self.admitted else 0.0,
+        "wait_max_ms": round(1000 * self.wait_max, 3),
+      }
+
+def _parse_admission_limits(spec: str) -> dict:
+  gates = {}
+  for part in f"{ADMISSION_DEFAULTS},{spec}".split(","):
+    name, _, val = part.strip().partition("=")
+    if not name:
+      continue
+    limit, _, queue = val.partition(":")
+    gates[name] = AdmissionGate(name, int(limit or 1), int(queue or 0))
+  return gates
+
+ADMISSION = _parse_admission_limits(ADMISSION_LIMITS)
+
+def route_class(name: str):
+  """Ordnet einen View einer Admission-Klasse zu (Default: light)."""
+  def deco(fn):
+    fn.route_class = name
+    return fn
+  return deco
+
+def _request_route_class() -> str:
+  if request.endpoint == "static":
+    return "static"
+  if request.endpoint == "index" and request.args.get("aoi"):
+    return "light"   # ?aoi= decodes up to AOI_CODE_MAX_BYTES, not a static asset
+  view = app.view_functions.get(request.endpoint or "")
+  return getattr(view, "route_class", "light")
+
+# ---- Precomputed assets & warm-up
+ASSETS = {}    # name -> {"raw", "gz", "etag", "mimetype"}
+WARMUPS = []   # (name, fn), run by startup()
+
+def warmup(name: str):
+  """Registriert einmalige Arbeit, die vor dem ersten Request erledigt wird."""
+  def deco(fn):
+    WARMUPS.append((name, fn))
+    return fn
+  return deco
+
+def _build_asset(name: str, body: str, mimetype: str) -> dict:
+  import gzip
+  import hashlib
+  raw = body.encode("utf-8")
+  asset = {
+    "raw": raw,
+    "gz": gzip.compress(raw, compresslevel=9, mtime=0),
+    "etag": '"%s"' % hashlib.sha1(raw).hexdigest()[:20],
+    "mimetype": mimetype,
+  }
+  ASSETS[name] = asset
+  return asset
+
+def _render_index() -> str:
+  return render_template_string(
+    INDEX_HTML,
+    title=APP_TITLE,
+    start_lat=START_LAT,
+    start_lon=START_LON,
+    start_zoom=START_ZOOM,
+    tile_proxy=TILE_PROXY,
+    service_worker=SERVICE_WORKER,
+  )
+
+def _render_sw() -> str:
+  import hashlib
+  import json
+  from urllib.parse import urlsplit
+  shell = {"/": "index.html", "/static/app.js": "app.js", "/static/app.css": "app.css"}
+  version = hashlib.sha1("".join(
+    [_asset(name)["etag"] for name in shell.values()] + VENDOR_URLS).encode()).hexdigest()[:16]
+  hosts = sorted({urlsplit(u).hostname for u in TILE_UPSTREAMS_DEFAULT.values()})
+  return (SW_JS
+    .replace("__VERSION__", json.dumps(version))
+    .replace("__SHELL__", json.dumps(list(shell)))
+    .replace("__VENDOR__", json.dumps(VENDOR_URLS))
+    .replace("__TILE_QUOTA__", str(SW_TILE_QUOTA))
+    .replace("__TILE_HOSTS__", json.dumps(hosts)))
+
+def _asset(name: str) -> dict:
+  asset = ASSETS.get(name)
+  if asset is None:
+    if name == "index.html":
+      asset = _build_asset(name, _render_index(), "text/html")
+    elif name == "sw.js":
+      asset = _build_asset(name, _render_sw(), "application/javascript")
+    elif name == "app.css":
+      asset = _build_asset(name, APP_CSS, "text/css")
+    else:
+      asset = _build_asset(name, APP_JS, "application/javascript")
+  return asset
+
+def _serve_asset(name: str) -> Response:
+  asset = _asset(name)
+  gz = "gzip" in request.accept_encodings
+  # each encoding is its own representation, so the gzip body gets its own strong ETag
+  etag = asset["etag"][:-1] + '-gz"' if gz else asset["etag"]
+  if etag in request.headers.get("If-None-Match", ""):
+    resp = Response(status=304)
+  elif gz:
+    resp = Response(asset["gz"], mimetype=asset["mimetype"])
+    resp.headers["Content-Encoding"] = "gzip"
+  else:
+    resp = Response(asset["raw"], mimetype=asset["mimetype"])
+  resp.headers["ETag"] = etag
+  resp.headers["Vary"] = "Accept-Encoding"
+  resp.headers["Cache-Control"] = "no-cache"
+  return resp
+
+@warmup("assets")
+def _warm_assets() -> None:
+  with app.app_context():
+    for name in ("index.html", "app.css", "app.js", "sw.js"):
+      _asset(name)
+
+def startup() -> None:
+  """Einmalige Arbeit vor dem Öffnen des Ports (STARTUP_MODE=eager, aus cli() bzw. dem WSGI-Server-Hook)."""
+  for name, fn in WARMUPS:
+    with startup_phase(f"warmup:{name}"):
+      fn()
+  STARTUP["ready_ms"] = round((time.perf_counter() - _T0) * 1000, 3)
+  print(f"[startup] ready after {STARTUP['ready_ms']:.1f} ms", file=sys.stderr, flush=True)
+
+with startup_phase("app:create"):
+  app = Flask(__name__)
+  app.config["JSON_SORT_KEYS"] = False
+  app.config["JSON_AS_ASCII"] = False
+  app.config["MAX_FORM_MEMORY_SIZE"] = 64 * 1024 * 1024   # AOI als Multipart-Feld
+
+@app.before_request
+def _admit():
+  if request.method == "OPTIONS":
+    # CORS preflight: sofort beantworten, ohne Admission-Slot
+    resp = Response(status=204)
+    resp.headers["Access-Control-Max-Age"] = str(CORS_MAX_AGE)
+    return resp
+
+  gate = ADMISSION[_request_route_class()]
+  waited = gate.acquire(ADMISSION_QUEUE_TIMEOUT)
+  if waited is None:
+    resp = jsonify({"ok": False, "error": "Überlastet, bitte später erneut versuchen.", "class": gate.name})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(ADMISSION_RETRY_AFTER)
+    return resp
+  g.admission = (gate, waited)
+
+@app.teardown_request
+def _release(_exc=None):
+  adm = g.pop("admission", None)
+  if adm and not g.pop("admission_held", False):
+    adm[0].release()
+
+def streamed(resp: Response) -> Response:
+  """Slot bis zum Ende des gestreamten Bodys halten (Teardown läuft schon vorher)."""
+  adm = g.get("admission")
+  if adm:
+    g.admission_held = True
+    resp.call_on_close(adm[0].release)
+  return resp
 
 @app.after_request
 def _add_headers(resp: Response) -> Response:
   resp.headers["Access-Control-Allow-Origin"] = "*"
   resp.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS"
   resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
+  adm = g.get("admission")
+  if adm:
+    resp.headers["Server-Timing"] = f"queue;desc=\"{adm[0].name}\";dur={adm[1] * 1000:.3f}"
+  if STARTUP["first_200_ms"] is None and resp.status_code == 200:
+    STARTUP["first_200_ms"] = round((time.perf_counter() - _T0) * 1000, 3)
   return resp
 
 @app.get("/")
+@route_class("static")
 def index():
-  return render_template_string(
-    INDEX_HTML,
-    title=APP_TITLE,
-    start_lat=START_LAT,
-    start_lon=START_LON,
-    start_zoom=START_ZOOM,
-  )
+  code = request.args.get("aoi")
+  if not code:
+    return _serve_asset("index.html")
+  # ?aoi=<code>: decoded here so the page starts with the AOI in `drawn`;
+  # invalid codes fall through to the client decoder (and its error toast)
+  try:
+    fc = decode_aoi(code)
+  except ValueError:
+    return _serve_asset("index.html")
+  inject = "<script>window.__AOI_STUDIO__.aoi = %s;</script>\n  " % js_json(fc).replace("<", "\\u003c")
+  html = _asset("index.html")["raw"].decode("utf-8").replace(
+    '<script src="/static/app.js">', inject + '<script src="/static/app.js">', 1)
+  resp = Response(html, mimetype="text/html")
+  resp.headers["Cache-Control"] = "no-cache"
+  return resp
 
 @app.get("/static/app.css")
+@route_class("static")
 def static_css():
-  return Response(APP_CSS, mimetype="text/css; charset=utf-8")
+  return _serve_asset("app.css")
 
 @app.get("/static/app.js")
+@route_class("static")
 def static_js():
-  return Response(APP_JS, mimetype="application/javascript; charset=utf-8")
+  return _serve_asset("app.js")
+
+@app.get("/sw.js")
+@route_class("static")
+def service_worker():
+  resp = _serve_asset("sw.js")
+  resp.headers["Service-Worker-Allowed"] = "/"
+  return resp
 
 @app.get("/api/healthz")
+@route_class("health")
 def healthz():
   return jsonify({"ok": True, "service": "aoi-studio"})
 
+@app.get("/api/admission")
+@route_class("health")
+def admission_stats():
+  return jsonify({"ok": True, "classes": {name: gate.stats() for name, gate in ADMISSION.items()}})
+
+@app.get("/api/startup")
+@route_class("health")
+def startup_report():
+  return jsonify({"ok": True, **STARTUP})
+
+@app.get("/tiles/<source>/<int:z>/<int:x>/<int:y>")
+@route_class("tiles")
+def tile(source: str, z: int, x: int, y: int):
+  tmpl = TILE_SOURCES.get(source)
+  if tmpl is None or not 0 <= z <= 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+    return _bad_request("Unbekannte Kachel.", 404)
+  key = f"{source}/{z}/{x}/{y}"
+  url = tmpl.replace("{s}", "a").replace("{z}", str(z)).replace("{x}", str(x)).replace("{y}", str(y))
+
+  cached = TILES.get(key)
+  state = "HIT"
+  if cached and cached[1] > TILE_MAX_AGE:
+    if cached[1] <= TILE_STALE_MAX:
+      TILES.count("stale")
+      TILES.refresh_async(key, url)
+      state = "STALE"
+    else:
+      cached = None
+  if cached:
+    if state == "HIT":
+      TILES.count("hits")
+    data = cached[0]
+  else:
+    TILES.count("misses")
+    state = "MISS"
+    status, data = TILES.fetch(key, url) or (504, b"")
+    if status != 200:
+      old = TILES.get(key)
+      if old is None:
+        return _bad_request(f"Upstream-Fehler ({status}).", 404 if status == 404 else 502)
+      data, state = old[0], "STALE"
+
+  resp = Response(data, mimetype=_tile_mimetype(data))
+  resp.headers["Cache-Control"] = f"public, max-age={min(TILE_MAX_AGE, 86400)}"
+  resp.headers["X-Cache"] = state
+  return resp
+
+@app.get("/api/tiles/stats")
+@route_class("health")
+def tile_stats():
+  return jsonify({"ok": True, "sources": sorted(TILE_SOURCES), **TILES.stats()})
+
+@app.get("/api/cache")
+@route_class("health")
+def cache_stats():
+  shared = shared_cache()
+  return jsonify({"ok": True, "enabled": shared is not None, **(shared.stats() if shared else {})})
+
 @app.get("/api/example")
 def example():
-  return jsonify({
+  return geojson_response({
     "type": "FeatureCollection",
     "features": [{
       "type": "Feature",
@@ -1042,6 +2207,2679 @@ def example():
     }]
   })
 
+# ---- Tile proxy with disk cache
+def _parse_upstreams(spec: str) -> dict:
+  ups = dict(TILE_UPSTREAMS_DEFAULT)
+  for part in spec.split(","):
+    name, _, url = part.strip().partition("=")
+    if name and url:
+      ups[name] = url
+  return ups
+
+class TileCache:
+  """Disk-Cache für Kacheln: LRU nach Größe, stale-while-revalidate, Miss-Coalescing."""
+
+  def __init__(self, root: str, max_bytes: int):
+    self.root = root
+    self.max_bytes = max_bytes
+    self._lock = threading.Lock()
+    self._lru = None          # relpath -> size, ältester zuerst (lazy geladen)
+    self._bytes = 0
+    self._inflight = {}       # key -> [Event, result]
+    self.hits = self.misses = self.stale = self.errors = self.evicted = 0
+
+  def _load(self) -> None:
+    from collections import OrderedDict
+    entries = []
+    for dirpath, _, files in os.walk(self.root):
+      for name in files:
+        path = os.path.join(dirpath, name)
+        try:
+          st = os.stat(path)
+        except OSError:
+          continue
+        entries.append((st.st_atime, os.path.relpath(path, self.root), st.st_size))
+    entries.sort()
+    self._lru = OrderedDict((rel, size) for _, rel, size in entries)
+    self._bytes = sum(size for _, _, size in entries)
+
+  def get(self, key: str):
+    """(data, age_s) oder None."""
+    path = os.path.join(self.root, key)
+    try:
+      with open(path, "rb") as fh:
+        data = fh.read()
+      age = time.time() - os.stat(path).st_mtime
+    except OSError:
+      return None
+    with self._lock:
+      if self._lru is None:
+        self._load()
+      if key in self._lru:
+        self._lru.move_to_end(key)
+    return data, age
+
+  def put(self, key: str, data: bytes) -> None:
+    path = os.path.join(self.root, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+      fh.write(data)
+    os.replace(tmp, path)
+    with self._lock:
+      if self._lru is None:
+        self._load()
+      self._bytes += len(data) - self._lru.pop(key, 0)
+      self._lru[key] = len(data)
+      while self._bytes > self.max_bytes and len(self._lru) > 1:
+        old, size = self._lru.popitem(last=False)
+        self._bytes -= size
+        self.evicted += 1
+        try:
+          os.remove(os.path.join(self.root, old))
+        except OSError:
+          pass
+
+  def count(self, name: str) -> None:
+    """Statistik-Zähler erhöhen (Request-Threads zählen parallel)."""
+    with self._lock:
+      setattr(self, name, getattr(self, name) + 1)
+
+  def fetch(self, key: str, url: str):
+    """Upstream-Abruf; parallele Misses für dieselbe Kachel teilen sich einen Request."""
+    import http.client
+    with self._lock:
+      slot = self._inflight.get(key)
+      leader = slot is None
+      if leader:
+        slot = self._inflight[key] = [threading.Event(), None]
+    if not leader:
+      slot[0].wait(TILE_TIMEOUT + 1)
+      return slot[1]
+    try:
+      slot[1] = self._download(url)
+      if slot[1][0] == 200:
+        self.put(key, slot[1][1])
+    except (OSError, http.client.HTTPException) as e:
+      # URLError/timeouts/resets and truncated bodies (IncompleteRead) alike
+      self.count("errors")
+      slot[1] = (502, str(e).encode())
+    finally:
+      with self._lock:
+        self._inflight.pop(key, None)
+      slot[0].set()
+    return slot[1]
+
+  def refresh_async(self, key: str, url: str) -> None:
+    with self._lock:
+      if key in self._inflight:
+        return
+    threading.Thread(target=self.fetch, args=(key, url), daemon=True).start()
+
+  @staticmethod
+  def _download(url: str):
+    import urllib.error
+    import urllib.request
+    req = urllib.request.Request(url, headers={"User-Agent": TILE_USER_AGENT})
+    try:
+      with urllib.request.urlopen(req, timeout=TILE_TIMEOUT) as r:
+        return r.status, r.read()
+    except urllib.error.HTTPError as e:
+      return e.code, b""
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        "bytes": self._bytes, "tiles": len(self._lru or ()), "max_bytes": self.max_bytes,
+        "hits": self.hits, "misses": self.misses, "stale": self.stale,
+        "errors": self.errors, "evicted": self.evicted,
+      }
+
+TILE_SOURCES = _parse_upstreams(TILE_UPSTREAMS)
+TILES = TileCache(TILE_CACHE_DIR, TILE_CACHE_MAX_MB * 1024 * 1024)
+
+def _tile_mimetype(data: bytes) -> str:
+  if data[:8] == b"\x89PNG\r\n\x1a\n":
+    return "image/png"
+  if data[:3] == b"\xff\xd8\xff":
+    return "image/jpeg"
+  if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+    return "image/webp"
+  return "application/octet-stream"
+
+# ---- Projections (mirror of the proj4 defs in APP_JS)
+EXPORT_CRS = ("EPSG:4326", "EPSG:25832", "EPSG:25833", "EPSG:3857")
+GRS80_A = 6378137.0
+GRS80_RF = 298.257222101
+MERC_R = 6378137.0
+
+def pick_auto_utm(lon: float) -> str:
+  return "EPSG:25832" if lon < 12.0 else "EPSG:25833"
+
+def resolve_crs(sel: str, fc: dict = None) -> str:
+  """AUTO_UTM -> Zone nach Bounds-Zentrum der AOI (wie im Browser)."""
+  if sel != "AUTO_UTM":
+    return sel
+  b = fc_bounds(fc) if fc else None
+  return pick_auto_utm((b[0] + b[2]) / 2) if b else "EPSG:25832"
+
+class _ETMerc:
+  """Transverse Mercator nach Poder/Engsager (proj=utm in proj4/PROJ), vektorisiert."""
+
+  def __init__(self, zone: int, a: float = GRS80_A, rf: float = GRS80_RF, k0: float = 0.9996):
+    f0 = 1 / rf
+    es = 2 * f0 - f0 * f0
+    f = es / (1 + (1 - es) ** 0.5)
+    n = f / (2 - f)
+    self.a, self.x0, self.lon0 = a, 500000.0, (zone * 6 - 183) * 3.141592653589793 / 180
+    n2, n3, n4, n5, n6 = n ** 2, n ** 3, n ** 4, n ** 5, n ** 6
+    self.cgb = (
+      n * (2 + n * (-2 / 3 + n * (-2 + n * (116 / 45 + n * (26 / 45 + n * (-2854 / 675)))))),
+      n2 * (7 / 3 + n * (-8 / 5 + n * (-227 / 45 + n * (2704 / 315 + n * (2323 / 945))))),
+      n3 * (56 / 15 + n * (-136 / 35 + n * (-1262 / 105 + n * (73814 / 2835)))),
+      n4 * (4279 / 630 + n * (-332 / 35 + n * (-399572 / 14175))),
+      n5 * (4174 / 315 + n * (-144838 / 6237)),
+      n6 * (601676 / 22275),
+    )
+    self.cbg = (
+      n * (-2 + n * (2 / 3 + n * (4 / 3 + n * (-82 / 45 + n * (32 / 45 + n * (4642 / 4725)))))),
+      n2 * (5 / 3 + n * (-16 / 15 + n * (-13 / 9 + n * (904 / 315 + n * (-1522 / 945))))),
+      n3 * (-26 / 15 + n * (34 / 21 + n * (8 / 5 + n * (-12686 / 2835)))),
+      n4 * (1237 / 630 + n * (-12 / 5 + n * (-24832 / 14175))),
+      n5 * (-734 / 315 + n * (109598 / 31185)),
+      n6 * (444337 / 155925),
+    )
+    self.qn = k0 / (1 + n) * (1 + n2 * (1 / 4 + n2 * (1 / 64 + n2 / 256)))
+    self.utg = (
+      n * (-0.5 + n * (2 / 3 + n * (-37 / 96 + n * (1 / 360 + n * (81 / 512 + n * (-96199 / 604800)))))),
+      n2 * (-1 / 48 + n * (-1 / 15 + n * (437 / 1440 + n * (-46 / 105 + n * (1118711 / 3870720))))),
+      n3 * (-17 / 480 + n * (37 / 840 + n * (209 / 4480 + n * (-5569 / 90720)))),
+      n4 * (-4397 / 161280 + n * (11 / 504 + n * (830251 / 7257600))),
+      n5 * (-4583 / 161280 + n * (108847 / 3991680)),
+      n6 * (-20648693 / 638668800),
+    )
+    self.gtu = (
+      n * (0.5 + n * (-2 / 3 + n * (5 / 16 + n * (41 / 180 + n * (-127 / 288 + n * (7891 / 37800)))))),
+      n2 * (13 / 48 + n * (-3 / 5 + n * (557 / 1440 + n * (281 / 630 + n * (-1983433 / 1935360))))),
+      n3 * (61 / 240 + n * (-103 / 140 + n * (15061 / 26880 + n * (167603 / 181440)))),
+      n4 * (49561 / 161280 + n * (-179 / 168 + n * (6601661 / 7257600))),
+      n5 * (34729 / 80640 + n * (-3418889 / 1995840)),
+      n6 * (212378941 / 319334400),
+    )
+
+  @staticmethod
+  def _gatg(coef, b):
+    import numpy as np
+    two_cos = 2 * np.cos(2 * b)
+    h1, h2 = coef[-1], 0.0
+    h = h1
+    for c in reversed(coef[:-1]):
+      h = -h2 + two_cos * h1 + c
+      h2, h1 = h1, h
+    return b + h * np.sin(2 * b)
+
+  @staticmethod
+  def _clens(coef, arg_r, arg_i):
+    import numpy as np
+    sin_r, cos_r = np.sin(arg_r), np.cos(arg_r)
+    sinh_i, cosh_i = np.sinh(arg_i), np.cosh(arg_i)
+    r = 2 * cos_r * cosh_i
+    i = -2 * sin_r * sinh_i
+    hr, hi, hr1, hi1 = coef[-1], 0.0, 0.0, 0.0
+    for c in reversed(coef[:-1]):
+      hr2, hi2, hr1, hi1 = hr1, hi1, hr, hi
+      hr = -hr2 + r * hr1 - i * hi1 + c
+      hi = -hi2 + i * hr1 + r * hi1
+    r = sin_r * cosh_i
+    i = cos_r * sinh_i
+    return r * hr - i * hi, r * hi + i * hr
+
+  def forward(self, lon, lat):
+    import numpy as np
+    lam = np.radians(lon) - self.lon0
+    cn = self._gatg(self.cbg, np.radians(lat))
+    sin_cn, cos_cn = np.sin(cn), np.cos(cn)
+    sin_ce, cos_ce = np.sin(lam), np.cos(lam)
+    cn = np.arctan2(sin_cn, cos_ce * cos_cn)
+    ce = np.arcsinh(sin_ce * cos_cn / np.hypot(sin_cn, cos_cn * cos_ce))
+    dcn, dce = self._clens(self.gtu, 2 * cn, 2 * ce)
+    return self.a * self.qn * (ce + dce) + self.x0, self.a * self.qn * (cn + dcn)
+
+  def inverse(self, x, y):
+    import numpy as np
+    cn = np.asarray(y, dtype=float) / (self.a * self.qn)
+    ce = (np.asarray(x, dtype=float) - self.x0) / (self.a * self.qn)
+    dcn, dce = self._clens(self.utg, 2 * cn, 2 * ce)
+    cn, ce = cn + dcn, np.arctan(np.sinh(ce + dce))
+    sin_cn, cos_cn = np.sin(cn), np.cos(cn)
+    sin_ce, cos_ce = np.sin(ce), np.cos(ce)
+    lam = np.arctan2(sin_ce, cos_ce * cos_cn)
+    phi = self._gatg(self.cgb, np.arctan2(sin_cn * cos_ce, np.hypot(sin_ce, cos_ce * cos_cn)))
+    return np.degrees(lam + self.lon0), np.degrees(phi)
+
+_UTM = {}
+
+def _utm(epsg: str) -> _ETMerc:
+  tm = _UTM.get(epsg)
+  if tm is None:
+    tm = _UTM[epsg] = _ETMerc(int(epsg[-2:]))
+  return tm
+
+def project(lon, lat, epsg: str):
+  """lon/lat (EPSG:4326, Arrays) -> x/y im Ziel-CRS."""
+  import numpy as np
+  lon = np.asarray(lon, dtype=float)
+  lat = np.asarray(lat, dtype=float)
+  if epsg == "EPSG:4326":
+    return lon, lat
+  if epsg == "EPSG:3857":
+    return MERC_R * np.radians(lon), MERC_R * np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+  if epsg in ("EPSG:25832", "EPSG:25833"):
+    return _utm(epsg).forward(lon, lat)
+  raise ValueError(f"Nicht unterstütztes CRS: {epsg}")
+
+@warmup("projections")
+def _warm_projections() -> None:
+  for epsg in EXPORT_CRS:
+    project([8.65], [49.87], epsg)
+
+# ---- Export engine (mirror of APP_JS, byte-identical output)
+def js_to_fixed(v, digits: int):
+  """Wie +v.toFixed(digits) in JS: Halb-auf-Rundung (betragsmäßig) auf dem exakten Binärwert."""
+  import numpy as np
+  v = np.asarray(v, dtype=float)
+  s = 10.0 ** digits
+  a = np.abs(v)
+  p = a * s
+  # exact rounding error of a*s (Dekker two-product, s is exact)
+  c = 134217729.0
+  t = a * c
+  ah = t - (t - a)
+  al = a - ah
+  t = s * c
+  sh = t - (t - s)
+  sl = s - sh
+  err = ((ah * sh - p) + ah * sl + al * sh) + al * sl
+  n = np.floor(p)
+  frac = p - n
+  n = n + ((frac > 0.5) | ((frac == 0.5) & (err >= 0)))
+  return np.where(a >= 1e21, v, np.copysign(n / s, v))
+
+def js_number(v) -> str:
+  """Number -> String wie in JS (kürzeste Darstellung, JS-Exponentenregeln)."""
+  if isinstance(v, bool):
+    return "true" if v else "false"
+  if isinstance(v, int):
+    return str(v)
+  if v != v or v in (float("inf"), float("-inf")):
+    return "null"
+  if v == 0:
+    return "0"
+  r = repr(float(v))
+  if "e" not in r:
+    # 1e-4 <= |v| < 1e16: Python and JS agree up to the trailing ".0"
+    return r[:-2] if r.endswith(".0") else r
+  sign = "-" if r[0] == "-" else ""
+  r = r.lstrip("-")
+  mant, _, exp = r.partition("e")
+  whole, _, frac = mant.partition(".")
+  if frac == "0":
+    frac = ""
+  digits = (whole + frac).lstrip("0")
+  n = len(whole) + int(exp or 0) if whole != "0" else int(exp or 0) - (len(frac) - len(frac.lstrip("0")))
+  digits = digits.rstrip("0")
+  k = len(digits)
+  if k <= n <= 21:
+    out = digits + "0" * (n - k)
+  elif 0 < n <= 21:
+    out = digits[:n] + "." + digits[n:]
+  elif -6 < n <= 0:
+    out = "0." + "0" * -n + digits
+  else:
+    e = n - 1
+    out = digits[0] + ("." + digits[1:] if k > 1 else "") + "e" + ("+" if e > 0 else "-") + str(abs(e))
+  return sign + out
+
+def js_json(obj, indent: int = 0, _level: int = 0) -> str:
+  """JSON.stringify(obj, null, indent) – inkl. JS-Zahlenformat."""
+  import json
+  if obj is None:
+    return "null"
+  if isinstance(obj, str):
+    return json.dumps(obj, ensure_ascii=False)
+  if isinstance(obj, (bool, int, float)):
+    return js_number(obj)
+  if isinstance(obj, list) and obj and all(type(v) is float for v in obj):
+    items = list(map(js_number, obj))   # positions: the bulk of any GeoJSON
+    open_, close = "[", "]"
+  elif isinstance(obj, dict):
+    items = [f"{json.dumps(str(k), ensure_ascii=False)}:{' ' if indent else ''}{js_json(v, indent, _level + 1)}"
+             for k, v in obj.items()]
+    open_, close = "{", "}"
+  else:
+    items = [js_json(v, indent, _level + 1) for v in obj]
+    open_, close = "[", "]"
+  if not items:
+    return open_ + close
+  if not indent:
+    return open_ + ",".join(items) + close
+  pad = "\n" + " " * (indent * (_level + 1))
+  return open_ + pad + ("," + pad).join(items) + "\n" + " " * (indent * _level) + close
+
+def _positions(coords, out: list):
+  if coords and isinstance(coords[0], (int, float)):
+    out.append(coords)
+  else:
+    for c in coords or []:
+      _positions(c, out)
+
+def _rebuild(coords, it):
+  if coords and isinstance(coords[0], (int, float)):
+    return next(it)
+  return [_rebuild(c, it) for c in coords or []]
+
+def _ring_lists(coords, depth: int, out: list) -> None:
+  if depth == 1:
+    out.append(coords)
+  else:
+    for c in coords:
+      _ring_lists(c, depth - 1, out)
+
+def _replace_rings(coords, depth: int, it):
+  if depth == 1:
+    return next(it)
+  return [_replace_rings(c, depth - 1, it) for c in coords]
+
+def _project_coords(coords, depth, epsg_out: str):
+  """Alle Positionen projizieren + roundPair, Struktur bleibt erhalten."""
+  import numpy as np
+  if depth:
+    rings = []
+    try:
+      _ring_lists(coords, depth, rings)
+      xy = np.asarray([p for r in rings for p in r], dtype=float)
+    except (TypeError, ValueError):
+      xy = None
+    if xy is not None and xy.ndim == 2 and xy.shape[1] == 2 and len(xy):
+      x, y = project(xy[:, 0], xy[:, 1], epsg_out)
+      pts = list(map(list, zip(js_to_fixed(x, 2).tolist(), js_to_fixed(y, 2).tolist())))
+      sizes = np.cumsum([0] + [len(r) for r in rings]).tolist()
+      return _replace_rings(coords, depth, (pts[a:b] for a, b in zip(sizes, sizes[1:])))
+  # generic path: z values, points, mixed nesting
+  pos = []
+  _positions(coords, pos)
+  if not pos:
+    return coords
+  x, y = project([p[0] for p in pos], [p[1] for p in pos], epsg_out)
+  x, y = js_to_fixed(x, 2).tolist(), js_to_fixed(y, 2).tolist()
+  new = [[x[i], y[i], p[2]] if len(p) > 2 and isinstance(p[2], (int, float)) else [x[i], y[i]]
+         for i, p in enumerate(pos)]
+  return _rebuild(coords, iter(new))
+
+def transform_fc(fc4326: dict, epsg_out: str) -> dict:
+  """Port von transformFC: Projektion + roundPair (6 bzw. 2 Nachkommastellen).
+
+  Neue Feature-/Property-Objekte, Geometrien nur dort neu, wo Koordinaten
+  projiziert werden (statt JSON-Kopie der ganzen Collection).
+  """
+  feats = [f for f in fc4326.get("features") or []]
+  if epsg_out == "EPSG:4326":
+    out = [{**f, "properties": {**(f.get("properties") or {}), "epsg": 4326}} for f in feats]
+    return {**fc4326, "features": out}
+  project([0.0], [0.0], epsg_out)   # sanity check
+
+  import numpy as np
+  code = int(epsg_out.split(":")[1])
+  # all rings of the chunk in one projection call; odd geometries go through _project_coords
+  rings, sizes, batched = [], [], {}
+  for i, f in enumerate(feats):
+    g = f.get("geometry")
+    depth = GEOJSON_DEPTH.get((g or {}).get("type"), 0) if g and g.get("coordinates") else 0
+    if depth:
+      n = len(rings)
+      try:
+        _ring_lists(g["coordinates"], depth, rings)
+      except TypeError:
+        del rings[n:]
+        continue
+      batched[i] = (n, len(rings))
+  new_rings = None
+  if rings:
+    try:
+      xy = np.asarray([p for r in rings for p in r], dtype=float)
+    except (TypeError, ValueError):
+      xy = None
+    if xy is not None and xy.ndim == 2 and xy.shape[1] == 2:
+      x, y = project(xy[:, 0], xy[:, 1], epsg_out)
+      pts = list(map(list, zip(js_to_fixed(x, 2).tolist(), js_to_fixed(y, 2).tolist())))
+      sizes = np.cumsum([0] + [len(r) for r in rings]).tolist()
+      new_rings = [pts[a:b] for a, b in zip(sizes, sizes[1:])]
+
+  out = []
+  for i, f in enumerate(feats):
+    g = f.get("geometry")
+    if not g or not g.get("coordinates"):
+      out.append(dict(f))
+      continue
+    depth = GEOJSON_DEPTH.get(g.get("type"), 0)
+    if new_rings is not None and i in batched:
+      a, b = batched[i]
+      coords = _replace_rings(g["coordinates"], depth, iter(new_rings[a:b]))
+    else:
+      coords = _project_coords(g["coordinates"], depth, epsg_out)
+    out.append({**f, "geometry": {**g, "coordinates": coords},
+                "properties": {**(f.get("properties") or {}), "epsg": code, "source_epsg": 4326}})
+  return {**fc4326, "features": out}
+
+def _js_round(v: float) -> int:
+  """Math.round: nächste ganze Zahl, bei .5 Richtung +unendlich."""
+  import math
+  r = math.floor(v)
+  return int(r + 1 if v - r >= 0.5 else r)
+
+def fc_to_topojson(fc: dict, epsg: str) -> dict:
+  """Port von fcToTopoJSON (gleiche Arc-Reihenfolge, gleiche Ausgabe)."""
+  k = 1e6 if epsg == "EPSG:4326" else 1e2
+
+  def quant_ring(ring):
+    out = []
+    for pt in ring:
+      q = (_js_round(pt[0] * k), _js_round(pt[1] * k))
+      if out and out[-1] == q:
+        continue
+      out.append(q)
+    if len(out) > 1 and out[0] == out[-1]:
+      out.pop()
+    return out
+
+  items = []
+  pts = []
+  for fi, f in enumerate(fc.get("features") or []):
+    g = f.get("geometry") if isinstance(f, dict) else None
+    if not isinstance(g, dict) or g.get("type") not in ("Polygon", "MultiPolygon"):
+      continue
+    polys = [g.get("coordinates") or []] if g["type"] == "Polygon" else (g.get("coordinates") or [])
+    try:
+      qpolys = [[r for r in map(quant_ring, poly or []) if len(r) >= 3] for poly in polys]
+    except (TypeError, IndexError, ValueError, OverflowError):
+      raise ValueError(f"Feature {fi}: Koordinaten müssen endliche Zahlenpaare [x, y] sein.")
+    for poly in qpolys:
+      for ring in poly:
+        pts.extend(ring)
+    items.append((g["type"], qpolys, f.get("properties") or {}))
+  min_x = min((p[0] for p in pts), default=0)
+  min_y = min((p[1] for p in pts), default=0)
+  max_x = max((p[0] for p in pts), default=0)
+  max_y = max((p[1] for p in pts), default=0)
+
+  seen, junctions = {}, set()
+  for _, qpolys, _ in items:
+    for poly in qpolys:
+      for ring in poly:
+        n = len(ring)
+        for i, p in enumerate(ring):
+          prev, nxt = ring[i - 1], ring[(i + 1) % n]
+          s = seen.get(p)
+          if s is None:
+            seen[p] = (prev, nxt)
+          elif s != (prev, nxt) and s != (nxt, prev):
+            junctions.add(p)
+
+  arcs, arc_ids = [], {}
+
+  def arc_index(arc):
+    fwd = tuple(arc)
+    if fwd in arc_ids:
+      return arc_ids[fwd]
+    rev = fwd[::-1]
+    if rev in arc_ids:
+      return ~arc_ids[rev]
+    arc_ids[fwd] = len(arcs)
+    arcs.append(arc)
+    return len(arcs) - 1
+
+  def ring_arcs(ring):
+    n = len(ring)
+    start = next((i for i, p in enumerate(ring) if p in junctions), -1)
+    if start < 0:
+      m = min(range(n), key=lambda i: ring[i])
+      return [arc_index(ring[m:] + ring[:m] + [ring[m]])]
+    out, cur = [], [ring[start]]
+    for j in range(1, n + 1):
+      p = ring[(start + j) % n]
+      cur.append(p)
+      if p in junctions:
+        out.append(arc_index(cur))
+        cur = [p]
+    return out
+
+  geometries = []
+  for gtype, qpolys, props in items:
+    poly_arcs = [[ring_arcs(r) for r in poly] for poly in qpolys]
+    geometries.append({
+      "type": gtype,
+      "arcs": poly_arcs[0] if gtype == "Polygon" else poly_arcs,
+      "properties": props,
+    })
+
+  encoded = [
+    [[p[0] - min_x, p[1] - min_y] if i == 0 else [p[0] - arc[i - 1][0], p[1] - arc[i - 1][1]]
+     for i, p in enumerate(arc)]
+    for arc in arcs
+  ]
+  return {
+    "type": "Topology",
+    "bbox": [min_x / k, min_y / k, max_x / k, max_y / k],
+    "transform": {"scale": [1 / k, 1 / k], "translate": [min_x / k, min_y / k]},
+    "objects": {"aoi": {"type": "GeometryCollection", "geometries": geometries}},
+    "arcs": encoded,
+  }
+
+def _js_string(v) -> str:
+  """String(v) in JS für JSON-Werte."""
+  if isinstance(v, str):
+    return v
+  if v is None:
+    return "null"
+  if isinstance(v, (bool, int, float)):
+    return js_number(v)
+  if isinstance(v, list):
+    return ",".join("" if x is None else _js_string(x) for x in v)
+  return "[object Object]"
+
+def _js_truthy(v) -> bool:
+  if isinstance(v, (list, dict)):
+    return True
+  return v is not None and v is not False and v != 0 and v != "" and v == v
+
+def _ensure_closed(ring):
+  if not ring or len(ring) < 3:
+    return ring
+  a, b = ring[0], ring[-1]
+  if a[0] == b[0] and a[1] == b[1]:
+    return ring
+  return ring + [[a[0], a[1]]]
+
+def _ring_wkt(ring) -> str:
+  return ", ".join(f"{js_number(p[0])} {js_number(p[1])}" for p in _ensure_closed(ring))
+
+def wkt_polygons(fc: dict) -> list:
+  """Ringlisten je Polygon ("(x y, …), (…)"), Reihenfolge wie in fcToWkt."""
+  polys = []
+  for f in fc.get("features") or []:
+    g = f.get("geometry")
+    if not g:
+      continue
+    if g.get("type") == "Polygon":
+      polys.append(g.get("coordinates"))
+    if g.get("type") == "MultiPolygon":
+      polys.extend(g.get("coordinates") or [])
+  return [", ".join(f"({_ring_wkt(r)})" for r in (poly or [])) for poly in polys]
+
+def fc_to_wkt(fc: dict) -> str:
+  """Port von fcToWkt: Polygone -> POLYGON bzw. MULTIPOLYGON."""
+  rings = wkt_polygons(fc)
+  if not rings:
+    return ""
+  if len(rings) == 1:
+    return f"POLYGON({rings[0]})"
+  return "MULTIPOLYGON(" + ", ".join(f"({r})" for r in rings) + ")"
+
+def _kml_esc(v) -> str:
+  return (_js_string(v).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+          .replace('"', "&quot;").replace("'", "&apos;"))
+
+KML_HEAD = ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+            f"<name>{_kml_esc('aoi-studio export')}</name>")
+KML_TAIL = "</Document></kml>"
+
+def kml_placemarks(fc4326: dict) -> list:
+  """(escapter Name oder None, Geometrie-KML) je Placemark; None -> "AOI {i}"."""
+  def ring_kml(ring) -> str:
+    return " ".join(f"{js_number(p[0])},{js_number(p[1])},0" for p in _ensure_closed(ring))
+
+  def poly_kml(poly) -> str:
+    if not poly or not poly[0]:
+      return ""
+    k = f"<Polygon><outerBoundaryIs><LinearRing><coordinates>{ring_kml(poly[0])}</coordinates></LinearRing></outerBoundaryIs>"
+    for h in poly[1:]:
+      k += f"<innerBoundaryIs><LinearRing><coordinates>{ring_kml(h)}</coordinates></LinearRing></innerBoundaryIs>"
+    return k + "</Polygon>"
+
+  out = []
+  for f in fc4326.get("features") or []:
+    g = f.get("geometry")
+    if not g:
+      continue
+    if g.get("type") == "Polygon":
+      geom = poly_kml(g.get("coordinates"))
+    elif g.get("type") == "MultiPolygon":
+      geom = "<MultiGeometry>" + "".join(poly_kml(p) for p in g.get("coordinates") or []) + "</MultiGeometry>"
+    else:
+      continue
+    props = f.get("properties")
+    name = None
+    if _js_truthy(props):
+      name = props.get("name") if _js_truthy(props.get("name")) else props.get("title")
+    out.append((_kml_esc(name) if _js_truthy(name) else None, geom))
+  return out
+
+def fc4326_to_kml(fc4326: dict) -> str:
+  """Port von fc4326ToKml (lon,lat,0 in WGS84)."""
+  marks = kml_placemarks(fc4326)
+  return KML_HEAD + "".join(f"<Placemark><name>{name or f'AOI {i}'}</name>{geom}</Placemark>"
+                            for i, (name, geom) in enumerate(marks, 1)) + KML_TAIL
+
+EXPORT_FORMATS = {
+  # format: (mimetype, filename as in the browser download); werkzeug adds the charset
+  "GeoJSON": ("application/geo+json", "aoi_epsg{code}.geojson"),
+  "WKT": ("text/plain", "aoi_epsg{code}.wkt.txt"),
+  "EWKT": ("text/plain", "aoi_epsg{code}.ewkt.txt"),
+  "KML": ("application/vnd.google-earth.kml+xml", "aoi.kml"),
+  "TopoJSON": ("application/json", "aoi_epsg{code}.topojson"),
+}
+EXPORT_CHUNK = 500   # Features je Transformationsschritt (Fortschritt)
+
+def build_fc4326(fc: dict) -> dict:
+  """Wie buildFC4326: nur Features, properties.epsg = 4326 (Geometrien werden geteilt, nicht kopiert)."""
+  feats = []
+  for f in fc.get("features") or []:
+    if not isinstance(f, dict) or f.get("type") != "Feature":
+      continue
+    feats.append({**f, "properties": {**(f.get("properties") or {}), "epsg": 4326}})
+  return {"type": "FeatureCollection", "features": feats}
+
+def count_vertices(fc: dict) -> int:
+  n = 0
+  for f in fc.get("features") or []:
+    g = (f or {}).get("geometry") or {}
+    depth = GEOJSON_DEPTH.get(g.get("type"))
+    rings = []
+    try:
+      if depth:
+        _ring_lists(g.get("coordinates") or [], depth, rings)
+        n += sum(map(len, rings))
+        continue
+    except TypeError:
+      pass
+    pos = []
+    _positions(g.get("coordinates"), pos)
+    n += len(pos)
+  return n
+
+def export_chunk(features: list, epsg: str, fmt: str):
+  """Export-Stück für Features in Eingabereihenfolge (picklebar, für Prozess-Pools).
+
+  Rückgabe je Format: GeoJSON -> Text der Features (ohne Klammern),
+  WKT/EWKT -> Ringlisten je Polygon, KML -> Placemarks (siehe kml_placemarks).
+  """
+  fc4326 = build_fc4326({"features": features})
+  if fmt == "KML":
+    return kml_placemarks(fc4326)
+  out = transform_fc(fc4326, epsg)["features"]
+  if fmt in ("WKT", "EWKT"):
+    return wkt_polygons({"features": out})
+  if not out:
+    return ""
+  if epsg != "EPSG:4326":
+    return dumps_geojson(out, 2, 2, 1)[6:-4]   # "[\n    " … "\n  ]"
+  return ",\n    ".join(js_json(f, 2, 2) for f in out)
+
+class ExportWriter:
+  """Setzt export_chunk-Stücke in Reihenfolge zum Dokument zusammen (streamend)."""
+
+  def __init__(self, epsg: str, fmt: str, write):
+    self.epsg, self.fmt, self.write = epsg, fmt, write
+    self.count = 0
+    self._first_poly = None
+    if fmt == "KML":
+      write(KML_HEAD)
+
+  def add(self, part) -> None:
+    write = self.write
+    if self.fmt == "GeoJSON":
+      if part:
+        write(('{\n  "type": "FeatureCollection",\n  "features": [\n    ' if not self.count else ",\n    ") + part)
+        self.count += 1
+    elif self.fmt == "KML":
+      for name, geom in part:
+        self.count += 1
+        write(f"<Placemark><name>{name or f'AOI {self.count}'}</name>{geom}</Placemark>")
+    else:
+      for rings in part:
+        self.count += 1
+        if self.count == 1:
+          self._first_poly = rings   # POLYGON or MULTIPOLYGON? decided by the next one
+          continue
+        if self.count == 2:
+          write(f"SRID={self.epsg.split(':')[1]};" if self.fmt == "EWKT" else "")
+          write(f"MULTIPOLYGON(({self._first_poly})")
+        write(f", ({rings})")
+
+  def close(self) -> None:
+    write = self.write
+    if self.fmt == "GeoJSON":
+      write("\n  ]\n}" if self.count else '{\n  "type": "FeatureCollection",\n  "features": []\n}')
+    elif self.fmt == "KML":
+      write(KML_TAIL)
+    elif self.count == 1:
+      write((f"SRID={self.epsg.split(':')[1]};" if self.fmt == "EWKT" else "") + f"POLYGON({self._first_poly})")
+    elif self.count:
+      write(")")
+
+def export_fc(fc: dict, crs: str = "EPSG:4326", fmt: str = "GeoJSON", dissolve: bool = False,
+              write=None, progress=None) -> dict:
+  """Serverseitiger Export wie im Browser (gleiche Bytes wie Download/Copy).
+
+  write(str) erhält die Ausgabe in Stücken (Default: gesammelt in "text"),
+  progress(features_done, vertices_done) wird je Chunk aufgerufen.
+  """
+  import json
+  if fmt not in EXPORT_FORMATS:
+    raise ValueError(f"Unbekanntes Format: {fmt}")
+  if crs != "AUTO_UTM" and crs not in EXPORT_CRS:
+    raise ValueError(f"Nicht unterstütztes CRS: {crs}")
+  chunks = []
+  write = write or chunks.append
+
+  fc4326 = build_fc4326(fc)
+  if dissolve and fc4326["features"]:
+    # same 6-digit coordinates the browser receives from /api/dissolve
+    fc4326 = json.loads(dumps_geojson(dissolve_fc(fc4326)))
+  epsg = resolve_crs(crs, fc4326)
+  src = fc4326["features"]
+
+  if fmt == "TopoJSON":
+    feats, done_v = [], 0
+    for i in range(0, len(src), EXPORT_CHUNK):
+      part = src[i:i + EXPORT_CHUNK]
+      feats.extend(transform_fc({"features": part}, epsg)["features"])
+      done_v += count_vertices({"features": part})
+      if progress:
+        progress(len(feats), done_v)
+    write(js_json(fc_to_topojson({"type": "FeatureCollection", "features": feats}, epsg)))
+  else:
+    out = ExportWriter(epsg, fmt, write)
+    done_v = 0
+    for i in range(0, len(src), EXPORT_CHUNK):
+      part = src[i:i + EXPORT_CHUNK]
+      out.add(export_chunk(part, epsg, fmt))
+      done_v += count_vertices({"features": part})
+      if progress:
+        progress(i + len(part), done_v)
+    out.close()
+
+  mimetype, filename = EXPORT_FORMATS[fmt]
+  code = epsg.split(":")[1]
+  return {"epsg": epsg, "mimetype": mimetype, "filename": filename.format(code=code), "text": "".join(chunks)}
+
+# ---- GeoJSON writer (vectorized fixed-precision coordinates)
+GEOJSON_DEPTH = {"Point": 0, "MultiPoint": 1, "LineString": 1, "MultiLineString": 2, "Polygon": 2, "MultiPolygon": 3}
+GEOJSON_BLOCK = 65536   # Koordinaten je Formatierungsblock (Speicher: ~200 B je Zeile)
+
+def fixed_chars(v, digits: int):
+  """JS-Zahltext von +v.toFixed(digits) für ein ganzes Array als Zeichenmatrix.
+
+  Rückgabe (chars, mask): uint8 (n, w) und bool (n, w); Zeile i ergibt
+  chars[i][mask[i]]. Gerundete Werte mit <= 15 signifikanten Stellen sind in
+  JS' kürzester Darstellung genau die Dezimalziffern ohne Nullen am Ende;
+  alles andere (NaN, ±inf, sehr große/kleine Werte) geht über js_number.
+  """
+  import numpy as np
+  with np.errstate(invalid="ignore"):
+    q = js_to_fixed(v, digits)
+  a = np.abs(q)
+  special = ~(a < 10.0 ** (15 - digits)) | ((a > 0) & (a < 1e-6))
+  n = np.rint(np.where(special, 0.0, a) * 10 ** digits).astype(np.int64)
+  width = len(str(int(n.max()) // 10 ** digits)) if len(n) else 1
+  # rows: sign, integer digits, ".", fraction digits (built transposed, row-wise contiguous)
+  p10 = 10 ** np.arange(width + digits - 1, digits - 1, -1, dtype=np.int64)
+  dig = np.empty((width + digits, len(n)), dtype=np.uint8)
+  r = n
+  for k in range(width + digits - 1, -1, -1):   # scalar divisor per digit, lowest first
+    d = r // 10
+    dig[k] = r - d * 10
+    r = d
+  chars = np.empty((width + digits + 2, len(n)), dtype=np.uint8)
+  mask = np.empty(chars.shape, dtype=bool)
+  chars[0], mask[0] = ord("-"), (q < 0) & (n > 0)
+  chars[1:width + 1], mask[1:width + 1] = 48 + dig[:width], n >= p10[:, None]
+  mask[width] = True
+  chars[width + 2:], frac = 48 + dig[width:], mask[width + 2:]
+  # a fraction digit is printed if it or any digit right of it is non-zero
+  np.greater(dig[width:], 0, out=frac)
+  for k in range(digits - 2, -1, -1):
+    frac[k] |= frac[k + 1]
+  chars[width + 1], mask[width + 1] = ord("."), frac[0] if digits else False
+  chars, mask = chars.T, mask.T
+  cols = chars.shape[1]
+  idx = np.flatnonzero(special)
+  if len(idx):
+    texts = [js_number(float(q[i])).encode() for i in idx]
+    extra = max(map(len, texts)) - cols
+    if extra > 0:
+      chars = np.pad(chars, ((0, 0), (0, extra)))
+      mask = np.pad(mask, ((0, 0), (0, extra)))
+    else:
+      chars, mask = chars.copy(), mask.copy()
+    mask[idx] = False
+    for i, t in zip(idx, texts):
+      chars[i, :len(t)] = np.frombuffer(t, dtype=np.uint8)
+      mask[i, :len(t)] = True
+  return chars, mask
+
+def _char_table(texts: list):
+  import numpy as np
+  raw = [t.encode() for t in texts]
+  w = max(map(len, raw), default=0)
+  chars = np.zeros((len(raw), w), dtype=np.uint8)
+  mask = np.zeros((len(raw), w), dtype=bool)
+  for i, t in enumerate(raw):
+    chars[i, :len(t)] = np.frombuffer(t, dtype=np.uint8)
+    mask[i, :len(t)] = True
+  return chars, mask
+
+def ragged_positions(coords, depth: int):
+  """Verschachtelte GeoJSON-Koordinaten -> (xy, opens, closes) oder None.
+
+  opens[i]/closes[i]: Anzahl Arrays, die direkt vor/nach Position i beginnen
+  bzw. enden. None bei leeren Teil-Arrays oder nicht-2D-Positionen.
+  """
+  import itertools
+  import numpy as np
+  pts, first, last = [], [], []
+
+  def walk(c, d):
+    if not isinstance(c, (list, tuple)) or not c:
+      raise ValueError
+    start = len(pts)
+    if d == 1:
+      pts.extend(c)
+    else:
+      for x in c:
+        walk(x, d - 1)
+    first.append(start)
+    last.append(len(pts) - 1)
+
+  try:
+    if depth:
+      walk(coords, depth)
+    else:
+      pts.append(coords)
+    # flat fromiter instead of asarray on the nested lists (about 3x faster)
+    if set(map(type, pts)) - {list, tuple} or set(map(len, pts)) != {2}:
+      return None
+    xy = np.fromiter(itertools.chain.from_iterable(pts), dtype=float, count=2 * len(pts)).reshape(-1, 2)
+  except (ValueError, TypeError):
+    return None
+  n = len(xy)
+  return xy, np.bincount(first, minlength=n), np.bincount(last, minlength=n)
+
+def encode_positions(xy, opens, closes, base, first, digits: int, indent: int = 0):
+  """Koordinatentext für viele Geometrien in einem Durchgang.
+
+  xy (N, 2), opens/closes je Position (siehe ragged_positions), base: Einrückungs-
+  ebene des Positions-Arrays, first: erste Position ihrer Geometrie. Formatiert
+  wird blockweise in eine Zeichenmatrix (Präfix | "[" | x | "," | y | "]" | Suffix),
+  die per Maske in einem Stück zu Bytes wird. Rückgabe (text, offsets je Position).
+  """
+  import numpy as np
+  nl = "\n" if indent else ""
+
+  def pad(level):
+    return nl + " " * (indent * level)
+
+  def small_unique(key):
+    seen = np.zeros(int(key.max()) + 1 if len(key) else 1, dtype=bool)
+    seen[key] = True
+    return np.flatnonzero(seen), (np.cumsum(seen) - 1)[key]
+
+  pkey = (base * 64 + opens) * 2 + first
+  pkeys, pid = small_unique(pkey)
+  pre = []
+  for k in pkeys.tolist():
+    b, o, f = k // 128, (k // 2) % 64, k % 2
+    pre.append(("" if f else "," + pad(b - o)) + "".join("[" + pad(l + 1) for l in range(b - o, b)))
+  skey = base * 64 + closes
+  skeys, sid = small_unique(skey)
+  suf = ["".join(pad(l) + "]" for l in range(k // 64 - 1, k // 64 - k % 64 - 1, -1)) for k in skeys.tolist()]
+  bkeys, bid = small_unique(base)
+  p_open = _char_table(["[" + pad(b + 1) for b in bkeys.tolist()])
+  p_mid = _char_table(["," + pad(b + 1) for b in bkeys.tolist()])
+  p_close = _char_table([pad(b) + "]" for b in bkeys.tolist()])
+  p_pre, p_suf = _char_table(pre), _char_table(suf)
+
+  pieces, lens = [], []
+  for a in range(0, len(xy), GEOJSON_BLOCK):
+    e = min(a + GEOJSON_BLOCK, len(xy))
+    b = bid[a:e]
+    segs = [
+      [t[pid[a:e]] for t in p_pre],
+      [t[b] for t in p_open],
+      fixed_chars(xy[a:e, 0], digits),
+      [t[b] for t in p_mid],
+      fixed_chars(xy[a:e, 1], digits),
+      [t[b] for t in p_close],
+      [t[sid[a:e]] for t in p_suf],
+    ]
+    chars = np.concatenate([c for c, _ in segs], axis=1)
+    mask = np.concatenate([m for _, m in segs], axis=1)
+    pieces.append(chars[mask].tobytes())
+    lens.append(np.count_nonzero(mask, axis=1))
+  offsets = np.zeros(len(xy) + 1, dtype=np.int64)
+  if lens:
+    np.cumsum(np.concatenate(lens), out=offsets[1:])
+  return b"".join(pieces).decode("ascii"), offsets
+
+def _geojson_walk(obj, indent: int, level: int, parts: list, geoms: list) -> None:
+  """Wie js_json, aber Geometrie-Koordinaten werden als Platzhalter (int) gesammelt."""
+  import json
+  if isinstance(obj, dict) and obj:
+    depth = GEOJSON_DEPTH.get(obj.get("type"))
+    pos = ragged_positions(obj.get("coordinates"), depth) if depth is not None else None
+    pad = "\n" + " " * (indent * (level + 1)) if indent else ""
+    parts.append("{")
+    for i, (k, v) in enumerate(obj.items()):
+      parts.append(("," if i else "") + pad + json.dumps(str(k), ensure_ascii=False) + (": " if indent else ":"))
+      if pos is not None and k == "coordinates":
+        geoms.append((pos, level + 1 + depth))
+        parts.append(len(geoms) - 1)
+      else:
+        _geojson_walk(v, indent, level + 1, parts, geoms)
+    parts.append(("\n" + " " * (indent * level) if indent else "") + "}")
+  elif isinstance(obj, (list, tuple)) and obj and any(isinstance(v, dict) for v in obj):
+    pad = "\n" + " " * (indent * (level + 1)) if indent else ""
+    parts.append("[")
+    for i, v in enumerate(obj):
+      parts.append(("," if i else "") + pad)
+      _geojson_walk(v, indent, level + 1, parts, geoms)
+    parts.append(("\n" + " " * (indent * level) if indent else "") + "]")
+  else:
+    parts.append(js_json(obj, indent, level))
+
+def geojson_chunks(obj, digits: int = 6, indent: int = 0, level: int = 0):
+  """GeoJSON-Text wie JSON.stringify(obj, null, indent) nach roundPair-Rundung.
+
+  Struktur und Properties laufen über js_json, alle Koordinaten gesammelt über
+  encode_positions (ein vektorisierter Durchgang für die ganze Collection).
+  Liefert Textstücke (für Streaming-Responses oder write()).
+  """
+  import numpy as np
+  parts, geoms = [], []
+  _geojson_walk(obj, indent, level, parts, geoms)
+  if geoms:
+    xy = np.concatenate([g[0][0] for g in geoms])
+    sizes = [len(g[0][0]) for g in geoms]
+    start = np.zeros(len(geoms) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=start[1:])
+    first = np.zeros(len(xy), dtype=np.int64)
+    first[start[:-1]] = 1
+    text, off = encode_positions(
+      xy,
+      np.concatenate([g[0][1] for g in geoms]),
+      np.concatenate([g[0][2] for g in geoms]),
+      np.repeat([g[1] for g in geoms], sizes),
+      first, digits, indent)
+    off = off[start].tolist()
+  buf = []
+  for p in parts:
+    if isinstance(p, int):
+      buf.append(text[off[p]:off[p + 1]])
+    else:
+      buf.append(p)
+    if len(buf) >= 256:
+      yield "".join(buf)
+      buf = []
+  if buf:
+    yield "".join(buf)
+
+def dumps_geojson(obj, digits: int = 6, indent: int = 0, level: int = 0) -> str:
+  return "".join(geojson_chunks(obj, digits, indent, level))
+
+def _pretty_indent() -> int:
+  return 2 if request.args.get("pretty") in ("1", "true") else 0
+
+def geojson_response(obj, digits: int = 6):
+  """GeoJSON-Response mit fester Präzision (6 Stellen für EPSG:4326), ?pretty=1 eingerückt."""
+  return Response(geojson_chunks(obj, digits, _pretty_indent()), mimetype="application/geo+json")
+
+# ---- Polygon rings as flat arrays
+def fc_bounds(fc: dict):
+  """(minLon, minLat, maxLon, maxLat) aller Polygon-Koordinaten oder None."""
+  rings = flatten_polygons(fc)
+  xy = rings["xy"]
+  if not len(xy):
+    return None
+  lo, hi = xy.min(axis=0), xy.max(axis=0)
+  return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+def flatten_polygons(fc: dict) -> dict:
+  """Alle (Multi)Polygone einer FC als flache Arrays.
+
+  xy: (N, 2) Koordinaten, ring_off: (R+1) Offsets in xy,
+  ring_poly: (R) Polygon-Index je Ring, poly_feat: (P) Feature-Index je Polygon.
+  Features ohne (Multi)Polygon werden übersprungen; kaputte Koordinaten -> ValueError.
+  """
+  import numpy as np
+  pts, ring_off, ring_poly, poly_feat = [], [0], [], []
+  for fi, f in enumerate(fc.get("features") or []):
+    g = f.get("geometry") if isinstance(f, dict) else None
+    if not isinstance(g, dict):
+      continue
+    if g.get("type") == "Polygon":
+      polys = [g.get("coordinates") or []]
+    elif g.get("type") == "MultiPolygon":
+      polys = g.get("coordinates") or []
+    else:
+      continue
+    try:
+      for poly in polys:
+        if not poly or len(poly[0]) < 3:
+          continue   # no usable shell: drop the polygon, its holes must not become areas
+        pi = len(poly_feat)
+        poly_feat.append(fi)
+        for ring in poly:
+          if len(ring) < 3:
+            continue
+          pts.extend(pt[:2] for pt in ring)
+          ring_off.append(len(pts))
+          ring_poly.append(pi)
+    except TypeError:
+      raise ValueError(f"Feature {fi}: Polygon-Koordinaten sind keine verschachtelten Listen.")
+  try:
+    xy = np.asarray(pts)
+  except ValueError:
+    xy = None   # ragged positions
+  if xy is None or len(pts) and (xy.ndim != 2 or xy.shape[1] != 2 or xy.dtype.kind not in "iuf"):
+    raise ValueError("Koordinaten müssen Zahlenpaare [x, y] sein.")
+  xy = xy.astype(float).reshape(-1, 2)
+  if not np.isfinite(xy).all():
+    raise ValueError("Koordinaten müssen endlich sein.")
+  return {
+    "xy": xy,
+    "ring_off": np.asarray(ring_off, dtype=np.int64),
+    "ring_poly": np.asarray(ring_poly, dtype=np.int64),
+    "poly_feat": np.asarray(poly_feat, dtype=np.int64),
+  }
+
+def ring_edges(rings: dict, xy=None):
+  """Kanten (x0, y0, x1, y1, poly) aller Ringe inkl. Schlusskante."""
+  import numpy as np
+  xy = rings["xy"] if xy is None else xy
+  off = rings["ring_off"]
+  nxt = np.arange(1, len(xy) + 1)
+  if len(off) > 1:
+    nxt[off[1:] - 1] = off[:-1]
+  poly = np.repeat(rings["ring_poly"], np.diff(off))
+  return xy[:, 0], xy[:, 1], xy[nxt, 0], xy[nxt, 1], poly
+
+# ---- Scanline rasterization (grid units: cell (c, r) = [c, c+1) x [r, r+1))
+def scan_spans(x0, y0, x1, y1, poly, row_lo=None, row_hi=None):
+  """Zellen, deren Mittelpunkt im Polygon liegt, als Spans (row, col_start, col_end, poly).
+
+  Even-odd je Polygon (Löcher werden ausgespart), vollständig vektorisiert:
+  alle Kanten/Zeilen-Schnitte auf einmal, dann Sortierung nach (poly, row, x).
+  """
+  import numpy as np
+  ylo, yhi = np.minimum(y0, y1), np.maximum(y0, y1)
+  ra = np.ceil(ylo - 0.5).astype(np.int64)
+  rb = np.ceil(yhi - 0.5).astype(np.int64)
+  if row_lo is not None:
+    ra = np.maximum(ra, row_lo)
+    rb = np.minimum(rb, row_hi)
+  cnt = np.maximum(rb - ra, 0)
+  total = int(cnt.sum())
+  if not total:
+    empty = np.zeros(0, dtype=np.int64)
+    return empty, empty, empty, empty
+  edge = np.repeat(np.arange(len(cnt)), cnt)
+  start = np.cumsum(cnt) - cnt
+  rows = ra[edge] + (np.arange(total) - start[edge])
+  t = (rows + 0.5 - y0[edge]) / (y1[edge] - y0[edge])
+  xc = x0[edge] + t * (x1[edge] - x0[edge])
+  p = poly[edge]
+  order = np.lexsort((xc, rows, p))
+  rows, xc, p = rows[order], xc[order], p[order]
+  r = rows[0::2]
+  cs = np.ceil(xc[0::2] - 0.5).astype(np.int64)
+  ce = np.ceil(xc[1::2] - 0.5).astype(np.int64)
+  keep = ce > cs
+  return r[keep], cs[keep], ce[keep], p[0::2][keep]
+
+def edge_cells(x0, y0, x1, y1):
+  """Alle Zellen, die von den Kanten berührt werden (Supercover), als (col, row, edge)."""
+  import numpy as np
+  dx, dy = x1 - x0, y1 - y0
+  fx0, fx1 = np.floor(x0), np.floor(x1)
+  fy0, fy1 = np.floor(y0), np.floor(y1)
+  nx = np.abs(fx1 - fx0).astype(np.int64)
+  ny = np.abs(fy1 - fy0).astype(np.int64)
+  n = len(x0)
+
+  def crossings(cnt, f0, f1, p0, d):
+    e = np.repeat(np.arange(n), cnt)
+    k = np.arange(int(cnt.sum())) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+    step = np.where(f1 >= f0, 1.0, -1.0)[e]
+    line = np.where(step > 0, f0[e] + 1 + k, f0[e] - k)
+    return e, (line - p0[e]) / d[e]
+
+  ex, tx = crossings(nx, fx0, fx1, x0, dx)
+  ey, ty = crossings(ny, fy0, fy1, y0, dy)
+  e = np.concatenate([np.arange(n), np.arange(n), ex, ey])
+  t = np.concatenate([np.zeros(n), np.ones(n), tx, ty])
+  order = np.lexsort((t, e))
+  e, t = e[order], t[order]
+  same = e[1:] == e[:-1]
+  em = e[1:][same]
+  tm = (t[1:][same] + t[:-1][same]) / 2
+  cols = np.floor(x0[em] + tm * dx[em]).astype(np.int64)
+  rows = np.floor(y0[em] + tm * dy[em]).astype(np.int64)
+  return cols, rows, em
+
+def sorted_unique(keys):
+  import numpy as np
+  keys = np.sort(keys)
+  if len(keys):
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+  return keys
+
+def sorted_member(keys, sorted_keys):
+  """Maske: keys[i] in sorted_keys (sortiert, eindeutig)."""
+  import numpy as np
+  if not len(sorted_keys):
+    return np.zeros(len(keys), dtype=bool)
+  pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+  return sorted_keys[pos] == keys
+
+def expand_spans(rows, cs, ce):
+  import numpy as np
+  cnt = ce - cs
+  idx = np.repeat(np.arange(len(cnt)), cnt)
+  cols = cs[idx] + (np.arange(int(cnt.sum())) - np.repeat(np.cumsum(cnt) - cnt, cnt))
+  return cols, rows[idx]
+
+# ---- Tile / grid cover
+COVER_MAX_CELLS = int(os.getenv("COVER_MAX_CELLS", "50000000"))
+
+def _grid_coords(rings: dict, grid: dict):
+  """AOI-Koordinaten in Zelleinheiten des Grids."""
+  import numpy as np
+  lon, lat = rings["xy"][:, 0], rings["xy"][:, 1]
+  if grid["type"] == "xyz":
+    n = 2.0 ** grid["zoom"]
+    lat = np.clip(lat, -85.0511287798, 85.0511287798)
+    gx = (lon + 180.0) / 360.0 * n
+    gy = (1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0 * n
+    return np.column_stack([gx, gy])
+  x, y = project(lon, lat, grid["crs"])
+  return np.column_stack([x / grid["size"], y / grid["size"]])
+
+def cover_cells(fc: dict, grid: dict):
+  """Überdeckende Zellen: (interior_keys, boundary_keys, decode(keys) -> (cols, rows)).
+
+  Eine Zelle schneidet die AOI genau dann, wenn sie von einer Kante berührt
+  wird oder ihr Mittelpunkt innen liegt. boundary sind die Zellen am Umriss
+  der Vereinigung (bei mehreren Polygonen per shapely.union_all), alle
+  übrigen liegen vollständig innen (interior).
+  """
+  import numpy as np
+  rings = flatten_polygons(fc)
+  empty = np.zeros(0, dtype=np.int64)
+  if not len(rings["xy"]):
+    return empty, empty, lambda keys: (empty, empty)
+  gxy = _grid_coords(rings, grid)
+  x0, y0, x1, y1, poly = ring_edges(rings, gxy)
+
+  rows, cs, ce, _ = scan_spans(x0, y0, x1, y1, poly)
+  n_inside = int((ce - cs).sum())
+  if n_inside > COVER_MAX_CELLS:
+    raise ValueError(f"Cover zu groß ({n_inside} Zellen, Limit {COVER_MAX_CELLS}).")
+  ic, ir = expand_spans(rows, cs, ce)
+  if len(rings["poly_feat"]) > 1:
+    # overlapping AOIs: edges inside another polygon are not boundary
+    x0, y0, x1, y1 = union_edges(rings, gxy)
+  bc, br, _ = edge_cells(x0, y0, x1, y1)
+
+  cmin = int(min(ic.min(initial=bc.min()), bc.min()))
+  rmin = int(min(ir.min(initial=br.min()), br.min()))
+  width = int(max(ic.max(initial=bc.max()), bc.max())) - cmin + 1
+  if grid["type"] == "xyz":
+    lim = 2 ** grid["zoom"]
+    ok = (bc >= 0) & (bc < lim) & (br >= 0) & (br < lim)
+    bc, br = bc[ok], br[ok]
+
+  boundary = sorted_unique((br - rmin) * width + (bc - cmin))
+  inside = sorted_unique((ir - rmin) * width + (ic - cmin))
+  interior = inside[~sorted_member(inside, boundary)]
+
+  def decode(keys):
+    return keys % width + cmin, keys // width + rmin
+  return interior, boundary, decode
+
+def union_edges(rings: dict, xy):
+  """Kanten (x0, y0, x1, y1) des Umrisses der Vereinigung aller Polygone."""
+  import numpy as np
+  import shapely
+  _, geoms = polygon_geometries(rings, xy)
+  union = shapely.union_all(shapely.make_valid(geoms))
+  outline = shapely.get_rings(shapely.get_parts(union))
+  pts, ring = shapely.get_coordinates(outline, return_index=True)
+  same = ring[1:] == ring[:-1]
+  return pts[:-1, 0][same], pts[:-1, 1][same], pts[1:, 0][same], pts[1:, 1][same]
+
+def cell_ids(cols, rows, grid: dict) -> list:
+  if grid["type"] == "xyz":
+    z = grid["zoom"]
+    return [f"{z}/{c}/{r}" for c, r in zip(cols.tolist(), rows.tolist())]
+  size = grid["size"]
+  label = f"{size // 1000}km" if size % 1000 == 0 else f"{size}m"
+  return [f"{label}E{c}N{r}" for c, r in zip(cols.tolist(), rows.tolist())]
+
+def _stream_ids(keys, decode, grid: dict, chunk: int = 65536):
+  for i in range(0, len(keys), chunk):
+    cols, rows = decode(keys[i:i + chunk])
+    yield ("," if i else "") + ",".join(f'"{x}"' for x in cell_ids(cols, rows, grid))
+
+def _parse_grid(args, fc: dict) -> dict:
+  kind = args.get("grid", "xyz")
+  if kind == "xyz":
+    zoom = int(args.get("zoom", "14"))
+    if not 0 <= zoom <= 24:
+      raise ValueError("zoom muss zwischen 0 und 24 liegen.")
+    return {"type": "xyz", "zoom": zoom}
+  if kind == "utm":
+    size = int(args.get("size", "1000"))
+    if size <= 0:
+      raise ValueError("size muss > 0 sein.")
+    crs = resolve_crs(args.get("crs", "AUTO_UTM"), fc)
+    if crs not in ("EPSG:25832", "EPSG:25833"):
+      raise ValueError("crs muss AUTO_UTM, EPSG:25832 oder EPSG:25833 sein.")
+    return {"type": "utm", "size": size, "crs": crs}
+  raise ValueError("grid muss xyz oder utm sein.")
+
+# ---- Raster masks (bit-packed, north-up grid)
+RASTER_MAX_PIXELS = int(os.getenv("RASTER_MAX_PIXELS", "1000000000"))
+RASTER_TILE_PIXELS = 1 << 21   # Pixel je Zeilenblock (Speicher ~ 16 B/Pixel)
+
+def raster_grid(fc: dict, crs: str, res: float, origin=(0.0, 0.0)) -> dict:
+  """Grid, das die AOI überdeckt: an origin + k * res ausgerichtet, Zeile 0 oben."""
+  import math
+  rings = flatten_polygons(fc)
+  if not len(rings["xy"]):
+    raise ValueError("Keine Polygone in der AOI.")
+  x, y = project(rings["xy"][:, 0], rings["xy"][:, 1], crs)
+  ox, oy = origin
+  left = ox + math.floor((float(x.min()) - ox) / res) * res
+  top = oy + math.ceil((float(y.max()) - oy) / res) * res
+  width = max(1, math.ceil((float(x.max()) - left) / res))
+  height = max(1, math.ceil((top - float(y.min())) / res))
+  if width * height > RASTER_MAX_PIXELS:
+    raise ValueError(f"Maske zu groß ({width}x{height} Pixel, Limit {RASTER_MAX_PIXELS}).")
+  return {
+    "crs": crs, "res": res, "width": width, "height": height,
+    "geotransform": [left, res, 0.0, top, 0.0, -res],
+    "_rings": rings, "_gx": (x - left) / res, "_gy": (top - y) / res,
+  }
+
+def raster_rows(grid: dict, tile_rows: int):
+  """Bit-gepackte Zeilenblöcke (uint8, MSB zuerst, Zeilen auf Bytes aufgefüllt).
+
+  Pixel ist gesetzt, wenn sein Mittelpunkt in einem Polygon liegt (Löcher
+  per even-odd ausgespart, Überlappungen vereinigt). Je Block nur die Kanten,
+  die ihn schneiden; Spans -> Differenzen je Zeile -> kumulierte Summe.
+  """
+  import numpy as np
+  w, h = grid["width"], grid["height"]
+  x0, y0, x1, y1, poly = ring_edges(grid["_rings"], np.column_stack([grid["_gx"], grid["_gy"]]))
+  ylo, yhi = np.minimum(y0, y1), np.maximum(y0, y1)
+  order = np.argsort(ylo, kind="stable")
+  x0, y0, x1, y1, poly, ylo, yhi = (a[order] for a in (x0, y0, x1, y1, poly, ylo, yhi))
+  for r0 in range(0, h, tile_rows):
+    r1 = min(h, r0 + tile_rows)
+    cand = np.arange(np.searchsorted(ylo, r1 + 1, side="right"))
+    cand = cand[yhi[cand] >= r0]
+    rows, cs, ce, _ = scan_spans(x0[cand], y0[cand], x1[cand], y1[cand], poly[cand], r0, r1)
+    cs, ce = np.clip(cs, 0, w), np.clip(ce, 0, w)
+    keep = ce > cs
+    base = (rows[keep] - r0) * (w + 1)
+    n = (r1 - r0) * (w + 1)
+    diff = np.bincount(base + cs[keep], minlength=n) - np.bincount(base + ce[keep], minlength=n)
+    mask = np.cumsum(diff.reshape(r1 - r0, w + 1), axis=1)[:, :w] > 0
+    yield np.packbits(mask, axis=1)
+
+def npy_header(shape: tuple, dtype: str = "|u1") -> bytes:
+  """NPY-Format 1.0 Kopf (Daten folgen C-order)."""
+  d = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': {tuple(shape)!r}, }}"
+  pad = 64 - (10 + len(d) + 1) % 64
+  d = d + " " * pad + "\n"
+  return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(d)) + d.encode("latin1")
+
+def geotiff_header(grid: dict, tile_rows: int) -> bytes:
+  """Kopf eines unkomprimierten 1-Bit-GeoTIFF; die Strips (= Zeilenblöcke) folgen direkt."""
+  w, h = grid["width"], grid["height"]
+  row_bytes = (w + 7) // 8
+  strips = [(r0, min(h, r0 + tile_rows)) for r0 in range(0, h, tile_rows)]
+  epsg = int(grid["crs"].split(":")[1])
+  geokeys = [1, 1, 0, 3, 1024, 0, 1, 2 if epsg == 4326 else 1, 1025, 0, 1, 1,
+             2048 if epsg == 4326 else 3072, 0, 1, epsg]
+  left, res, _, top, _, _ = grid["geotransform"]
+  # (tag, type, values): 3 = SHORT, 4 = LONG, 12 = DOUBLE
+  tags = [
+    (256, 4, [w]), (257, 4, [h]), (258, 3, [1]), (259, 3, [1]), (262, 3, [1]),
+    (273, 4, [0] * len(strips)), (277, 3, [1]), (278, 4, [tile_rows]),
+    (279, 4, [(r1 - r0) * row_bytes for r0, r1 in strips]), (284, 3, [1]),
+    (33550, 12, [res, res, 0.0]), (33922, 12, [0.0, 0.0, 0.0, left, top, 0.0]), (34735, 3, geokeys),
+  ]
+  fmt = {3: "H", 4: "I", 12: "d"}
+  ifd_size = 2 + 12 * len(tags) + 4
+  extra_off = 8 + ifd_size
+  extra_size = sum(len(v) * struct.calcsize(fmt[t]) for _, t, v in tags
+                   if len(v) * struct.calcsize(fmt[t]) > 4)
+  data_off = extra_off + extra_size
+  tags[5] = (273, 4, [data_off + r0 * row_bytes for r0, _ in strips])
+
+  ifd, extra = [struct.pack("<H", len(tags))], []
+  for tag, typ, vals in tags:
+    raw = struct.pack(f"<{len(vals)}{fmt[typ]}", *vals)
+    if len(raw) <= 4:
+      ifd.append(struct.pack("<HHI", tag, typ, len(vals)) + raw.ljust(4, b"\0"))
+    else:
+      ifd.append(struct.pack("<HHII", tag, typ, len(vals), extra_off + sum(map(len, extra))))
+      extra.append(raw)
+  ifd.append(struct.pack("<I", 0))
+  return b"II*\x00" + struct.pack("<I", 8) + b"".join(ifd) + b"".join(extra)
+
+# ---- Shared-memory cache (one mmap file for all worker processes)
+class SharedCache:
+  """Content-Hash -> Bytes, gemeinsam für alle Prozesse einer Instanz.
+
+  Layout der Datei (/dev/shm, little endian):
+    Header  magic | slots | data_size | head
+    Slots   seq | key0 | key1 | pos | length | stamp   (offene Adressierung, PROBES Plätze)
+    Daten   Ringpuffer; pos/head zählen monoton, Stelle = pos % data_size
+
+  Schreiben (FIFO): unter flock wird zuerst head vorgeschoben, dann werden
+  die Daten geschrieben und der Slot per Seqlock (seq ungerade/gerade)
+  veröffentlicht. Lesen ist lock-frei: Slot lesen, Daten kopieren, danach
+  seq und head erneut prüfen – Daten, die inzwischen überschrieben wurden
+  (pos < head - data_size), oder ein umgeschriebener Slot zählen als Miss.
+  """
+
+  MAGIC = b"AOISHM01"
+  HEADER = struct.Struct("<8sQQQ")
+  SLOT = struct.Struct("<QQQQQQ")
+  PROBES = 8
+
+  def __init__(self, path: str, size: int, slots: int):
+    import mmap
+    self.path, self.slots = path, slots
+    self.data_off = self.HEADER.size + slots * self.SLOT.size
+    self.data_size = size
+    self._lock = threading.Lock()
+    self.hits = self.misses = self.stores = 0
+    total = self.data_off + size
+    self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    with self._locked():
+      head = os.pread(self._fd, self.HEADER.size, 0)
+      if (os.fstat(self._fd).st_size != total or len(head) < self.HEADER.size
+          or self.HEADER.unpack(head)[:3] != (self.MAGIC, slots, size)):
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, total)
+        os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, slots, size, 0), 0)
+    self._mm = mmap.mmap(self._fd, total)
+
+  @contextmanager
+  def _locked(self):
+    import fcntl
+    with self._lock:
+      fcntl.flock(self._fd, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+  @staticmethod
+  def key(*parts) -> tuple:
+    import hashlib
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+      h.update(p if isinstance(p, bytes) else str(p).encode())
+      h.update(b"\0")
+    return struct.unpack("<QQ", h.digest())
+
+  def _head(self) -> int:
+    return self.HEADER.unpack_from(self._mm, 0)[3]
+
+  def _slot_off(self, i: int) -> int:
+    return self.HEADER.size + i * self.SLOT.size
+
+  def get(self, key: tuple):
+    """Bytes oder None (lock-frei)."""
+    mm = self._mm
+    for p in range(self.PROBES):
+      off = self._slot_off((key[0] + p) % self.slots)
+      seq, k0, k1, pos, length, _ = self.SLOT.unpack_from(mm, off)
+      if seq & 1 or (k0, k1) != key or not length:
+        continue
+      a = self.data_off + pos % self.data_size
+      data = mm[a:a + length]
+      if self.SLOT.unpack_from(mm, off)[0] == seq and pos >= self._head() - self.data_size:
+        self.hits += 1
+        return data
+    self.misses += 1
+    return None
+
+  def put(self, key: tuple, data: bytes) -> bool:
+    length = len(data)
+    if not length or length > self.data_size // 4:
+      return False
+    mm = self._mm
+    with self._locked():
+      head = self._head()
+      if head % self.data_size + length > self.data_size:
+        head += self.data_size - head % self.data_size   # no wrap inside an entry
+      # publish the new head before overwriting: readers of old entries will notice
+      self.HEADER.pack_into(mm, 0, self.MAGIC, self.slots, self.data_size, head + length)
+      a = self.data_off + head % self.data_size
+      mm[a:a + length] = data
+
+      floor = head + length - self.data_size
+      best, best_stamp = None, None
+      for p in range(self.PROBES):
+        i = (key[0] + p) % self.slots
+        _, k0, k1, pos, n, stamp = self.SLOT.unpack_from(mm, self._slot_off(i))
+        if (k0, k1) == key or not n or pos < floor:
+          best = i
+          break
+        if best is None or stamp < best_stamp:
+          best, best_stamp = i, stamp
+      off = self._slot_off(best)
+      seq = self.SLOT.unpack_from(mm, off)[0]
+      struct.pack_into("<Q", mm, off, seq + 1)
+      self.SLOT.pack_into(mm, off, seq + 1, key[0], key[1], head, length, head)
+      struct.pack_into("<Q", mm, off, seq + 2)
+    self.stores += 1
+    return True
+
+  def stats(self) -> dict:
+    head = self._head()
+    return {
+      "path": self.path, "size_mb": self.data_size // (1024 * 1024), "slots": self.slots,
+      "written_mb": round(head / (1024 * 1024), 1), "wrapped": head > self.data_size,
+      "pid": os.getpid(), "hits": self.hits, "misses": self.misses, "stores": self.stores,
+    }
+
+def pack_arrays(arrays: dict) -> bytes:
+  """Dict von numpy-Arrays -> Bytes (JSON-Kopf + Rohdaten)."""
+  import json
+  head, raw, off = {}, [], 0
+  for name, a in arrays.items():
+    b = a.tobytes()
+    head[name] = (a.dtype.str, a.shape, off, len(b))
+    raw.append(b)
+    off += len(b)
+  h = json.dumps(head).encode()
+  return struct.pack("<I", len(h)) + h + b"".join(raw)
+
+def unpack_arrays(data: bytes) -> dict:
+  import json
+  import numpy as np
+  n = struct.unpack_from("<I", data)[0]
+  base = 4 + n
+  return {name: np.frombuffer(data, dtype=dt, count=int(np.prod(shape)), offset=base + off).reshape(shape)
+          for name, (dt, shape, off, _) in json.loads(data[4:base]).items()}
+
+_SHARED = {}
+
+def shared_cache():
+  """Prozessweite SharedCache-Instanz (None, wenn deaktiviert oder nicht verfügbar)."""
+  pid = os.getpid()
+  if pid not in _SHARED:
+    _SHARED.clear()
+    try:
+      _SHARED[pid] = SharedCache(SHARED_CACHE_PATH, SHARED_CACHE_MB * 1024 * 1024, SHARED_CACHE_SLOTS) \
+        if SHARED_CACHE_MB > 0 else None
+    except (OSError, ImportError, ValueError) as e:
+      print(f"[shared-cache] disabled: {e}", file=sys.stderr)
+      _SHARED[pid] = None
+  return _SHARED[pid]
+
+def shared_payload(namespace: str, body: bytes, build, *params):
+  """build() -> bytes, über alle Worker nach Content-Hash gecacht."""
+  cache = shared_cache()
+  if cache is None:
+    return build()
+  key = cache.key(namespace, body, *params)
+  data = cache.get(key)
+  if data is None:
+    data = build()
+    cache.put(key, data)
+  return data
+
+# ---- Prepared point-in-AOI index
+CONTAINS_CACHE_SIZE = int(os.getenv("CONTAINS_CACHE_SIZE", "32"))
+CONTAINS_CHUNK = 1 << 20
+
+def geometry_hash(rings: dict, crs: str = "EPSG:4326") -> str:
+  import hashlib
+  h = hashlib.sha1(crs.encode())
+  for key in ("xy", "ring_off", "ring_poly", "poly_feat"):
+    h.update(rings[key].tobytes())
+  return h.hexdigest()[:24]
+
+class PreparedAOI:
+  """Grid-Index (R-Tree-Ersatz in numpy) + Kantenindex je Zelle für Punkt-in-AOI.
+
+  Je Zelle sind die berührenden Kanten sowie für jedes relevante Polygon
+  der Innen/Außen-Status des Zellmittelpunkts gespeichert. Für einen Punkt
+  genügt dann der Test der Strecke Punkt -> Zellmittelpunkt gegen die
+  wenigen Kanten der Zelle (Parität), alles vektorisiert über alle Punkte.
+  """
+
+  def __init__(self, rings: dict, crs: str = "EPSG:4326"):
+    import numpy as np
+    xy = rings["xy"]
+    if crs != "EPSG:4326" and len(xy):
+      xy = np.column_stack(project(xy[:, 0], xy[:, 1], crs))
+    self.n_edges = len(xy)
+    if not len(xy):
+      self.nx = self.ny = 0
+      return
+
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    span = np.maximum(hi - lo, 1e-9)
+    cells = min(max(4 * len(xy), 64), 1 << 22)
+    # nx * ny <= cells, whatever the aspect ratio (flat AOIs: one row)
+    self.nx = min(max(1, int(round((cells * span[0] / span[1]) ** 0.5))), cells)
+    self.ny = max(1, int(cells // self.nx))
+    self.origin = lo - span * 1e-6
+    self.cell = span * (1 + 2e-6) / (self.nx, self.ny)
+
+    gxy = (xy - self.origin) / self.cell
+    x0, y0, x1, y1, poly = ring_edges(rings, gxy)
+    self.ex0, self.ey0, self.ex1, self.ey1 = x0, y0, x1, y1
+
+    # (cell, polygon) entries: edge-touched cells + cells with center inside
+    ec, er, ee = edge_cells(x0, y0, x1, y1)
+    ok = (ec >= 0) & (ec < self.nx) & (er >= 0) & (er < self.ny)
+    ec, er, ee = ec[ok], er[ok], ee[ok]
+    ecell = er * self.nx + ec
+    rows, cs, ce, span_poly = scan_spans(x0, y0, x1, y1, poly)
+    ic, ir = expand_spans(rows, cs, ce)
+    icell = ir * self.nx + ic
+    ipoly = np.repeat(span_poly, ce - cs)
+
+    npoly = len(rings["poly_feat"])
+    inside_keys = sorted_unique(icell * npoly + ipoly)
+    keys = sorted_unique(np.concatenate([inside_keys, ecell * npoly + poly[ee]]))
+    self.entry_cell = keys // npoly
+    entry_poly = keys % npoly
+    self.entry_feat = rings["poly_feat"][entry_poly]
+    self.entry_inside = sorted_member(keys, inside_keys)
+    self.cell_ptr = np.searchsorted(self.entry_cell, np.arange(self.nx * self.ny + 1))
+
+    # per cell: edges and the entry they flip
+    order = np.lexsort((ee, ecell))
+    self.cedge = ee[order]
+    ecell = ecell[order]
+    self.cedge_entry = np.searchsorted(keys, ecell * npoly + poly[self.cedge])
+    self.cedge_ptr = np.searchsorted(ecell, np.arange(self.nx * self.ny + 1))
+
+  def to_arrays(self) -> dict:
+    import numpy as np
+    return {k: np.asarray(v) for k, v in vars(self).items()}
+
+  @classmethod
+  def from_arrays(cls, arrays: dict) -> "PreparedAOI":
+    prep = cls.__new__(cls)
+    for k, v in arrays.items():
+      setattr(prep, k, v if v.ndim else v.item())
+    return prep
+
+  def lookup(self, x, y):
+    """Feature-Index (niedrigster bei Überlappung) je Punkt, -1 = außerhalb."""
+    import numpy as np
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    out = np.full(len(x), -1, dtype=np.int32)
+    if not self.n_edges:
+      return out
+    for i in range(0, len(x), CONTAINS_CHUNK):
+      out[i:i + CONTAINS_CHUNK] = self._lookup(x[i:i + CONTAINS_CHUNK], y[i:i + CONTAINS_CHUNK])
+    return out
+
+  def _lookup(self, x, y):
+    import numpy as np
+    out = np.full(len(x), -1, dtype=np.int32)
+    gx = (x - self.origin[0]) / self.cell[0]
+    gy = (y - self.origin[1]) / self.cell[1]
+    cx, cy = np.floor(gx), np.floor(gy)
+    ok = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny)
+    pts = np.nonzero(ok)[0]
+    cell = (cy[pts] * self.nx + cx[pts]).astype(np.int64)
+    px, py = gx[pts], gy[pts]
+    qx, qy = cx[pts] + 0.5, cy[pts] + 0.5
+
+    # one pair per (point, entry of its cell)
+    e0 = self.cell_ptr[cell]
+    ecnt = self.cell_ptr[cell + 1] - e0
+    has = ecnt > 0
+    pts, cell, px, py, qx, qy, e0, ecnt = (a[has] for a in (pts, cell, px, py, qx, qy, e0, ecnt))
+    if not len(pts):
+      return out
+    pair_base = np.cumsum(ecnt) - ecnt
+    npairs = int(ecnt.sum())
+    pair_pt = np.repeat(np.arange(len(pts)), ecnt)
+    pair_entry = e0[pair_pt] + (np.arange(npairs) - pair_base[pair_pt])
+
+    # segment point -> cell center against the cell's edges
+    k0 = self.cedge_ptr[cell]
+    kcnt = self.cedge_ptr[cell + 1] - k0
+    flips = np.zeros(npairs, dtype=np.int64)
+    if kcnt.any():
+      kp = np.repeat(np.arange(len(pts)), kcnt)
+      k = k0[kp] + (np.arange(int(kcnt.sum())) - np.repeat(np.cumsum(kcnt) - kcnt, kcnt))
+      edge = self.cedge[k]
+      ax, ay, bx, by = self.ex0[edge], self.ey0[edge], self.ex1[edge], self.ey1[edge]
+      sx, sy, tx, ty = px[kp], py[kp], qx[kp], qy[kp]
+      o_a = (tx - sx) * (ay - sy) - (ty - sy) * (ax - sx)
+      o_b = (tx - sx) * (by - sy) - (ty - sy) * (bx - sx)
+      o_s = (bx - ax) * (sy - ay) - (by - ay) * (sx - ax)
+      o_t = (bx - ax) * (ty - ay) - (by - ay) * (tx - ax)
+      cross = ((o_a > 0) != (o_b > 0)) & ((o_s > 0) != (o_t > 0))
+      pair = pair_base[kp[cross]] + (self.cedge_entry[k[cross]] - e0[kp[cross]])
+      flips = np.bincount(pair, minlength=npairs)
+
+    inside = self.entry_inside[pair_entry] ^ (flips & 1).astype(bool)
+    feat = np.where(inside, self.entry_feat[pair_entry], np.iinfo(np.int32).max)
+    best = np.minimum.reduceat(feat, pair_base)
+    hit = best < np.iinfo(np.int32).max
+    out[pts[hit]] = best[hit]
+    return out
+
+_PREPARED = {}
+_PREPARED_LOCK = threading.Lock()
+
+def prepared_aoi(fc: dict = None, key: str = None, crs: str = "EPSG:4326"):
+  """(key, PreparedAOI) aus dem LRU-Cache, sonst aus dem Shared Cache; baut den Index bei Bedarf."""
+  if fc is not None:
+    rings = flatten_polygons(fc)
+    key = geometry_hash(rings, crs)
+  with _PREPARED_LOCK:
+    prep = _PREPARED.pop(key, None)
+    if prep is not None:
+      _PREPARED[key] = prep
+      return key, prep
+  shared = shared_cache()
+  data = shared.get(shared.key("prepared", key)) if shared else None
+  if data is not None:
+    prep = PreparedAOI.from_arrays(unpack_arrays(data))
+  elif fc is None:
+    return key, None
+  else:
+    prep = PreparedAOI(rings, crs)
+    if shared:
+      shared.put(shared.key("prepared", key), pack_arrays(prep.to_arrays()))
+  with _PREPARED_LOCK:
+    _PREPARED[key] = prep
+    while len(_PREPARED) > CONTAINS_CACHE_SIZE:
+      _PREPARED.pop(next(iter(_PREPARED)))
+  return key, prep
+
+def parse_points(data: bytes, content_type: str):
+  """Punkte aus JSON-Array, CSV oder float64-Paaren -> (x, y)."""
+  import io
+  import json
+  import numpy as np
+  ct = (content_type or "").split(";")[0].strip().lower()
+  if ct == "application/octet-stream":
+    if len(data) % 16:
+      raise ValueError("Binärdaten müssen float64-Paare (x, y) sein.")
+    arr = np.frombuffer(data, dtype="<f8").reshape(-1, 2)
+  elif ct in ("text/csv", "text/plain"):
+    first = data[:data.find(b"\n")] if b"\n" in data else data
+    skip = 1 if any(c.isalpha() for c in first.decode("utf-8", "replace")) else 0
+    arr = np.loadtxt(io.BytesIO(data), delimiter=",", usecols=(0, 1), skiprows=skip, ndmin=2, dtype=float)
+  else:
+    arr = np.asarray(json.loads(data) if isinstance(data, (bytes, str)) else data, dtype=float).reshape(-1, 2)
+  return arr[:, 0], arr[:, 1]
+
+# ---- Geometry operations
+def _bad_request(msg: str, status: int = 400) -> Response:
+  resp = jsonify({"ok": False, "error": msg})
+  resp.status_code = status
+  return resp
+
+def _request_fc():
+  return _as_fc(request.get_json(silent=True))
+
+def _as_fc(fc):
+  """Feature/FeatureCollection-dict -> FeatureCollection, sonst None."""
+  if isinstance(fc, dict) and fc.get("type") == "Feature":
+    fc = {"type": "FeatureCollection", "features": [fc]}
+  if not isinstance(fc, dict) or not isinstance(fc.get("features"), list):
+    return None
+  return fc
+
+def _polygonal(geom):
+  """Nur (Multi)Polygon-Anteile einer Geometrie, repariert falls ungültig."""
+  import shapely
+  if not geom.is_valid:
+    geom = shapely.make_valid(geom)
+  if geom.geom_type in ("Polygon", "MultiPolygon"):
+    return geom
+  parts = [p for p in getattr(geom, "geoms", []) if p.geom_type in ("Polygon", "MultiPolygon")]
+  return shapely.union_all(parts) if parts else None
+
+def dissolve_fc(fc: dict, by: str = None) -> dict:
+  """Union aller (bzw. je Property-Wert gruppierter) Polygone.
+
+  Geometrien entstehen wie bei buffer_fc vektorisiert aus flatten_polygons;
+  shapely.union_all nutzt GEOS' cascaded union über einen STR-Tree, d.h.
+  räumlich benachbarte Teile werden hierarchisch vereinigt statt paarweise.
+  """
+  import json
+  import shapely
+
+  rings = flatten_polygons(fc)
+  if not len(rings["xy"]):
+    return {"type": "FeatureCollection", "features": []}
+  idx, geoms = polygon_geometries(rings)
+  geoms = shapely.make_valid(geoms)
+  feats = fc.get("features") or []
+
+  groups = {}
+  for j, i in enumerate(idx.tolist()):
+    value = (feats[i].get("properties") or {}).get(by) if by else None
+    # lists/dicts group by their canonical JSON, the output keeps the value itself
+    key = (json.dumps(value, sort_keys=True),) if isinstance(value, (list, dict)) else value
+    groups.setdefault(key, (value, []))[1].append(j)
+
+  values, merged = [], []
+  for value, members in groups.values():
+    g = _polygonal(shapely.union_all(geoms[members]))
+    if g is None or g.is_empty:
+      continue
+    values.append((value, len(members)))
+    merged.append(g)
+
+  features = []
+  for (value, n), g in zip(values, polygon_coordinates(merged)):
+    if g is None:
+      continue
+    props = {"epsg": 4326, "dissolved": n}
+    if by:
+      props[by] = value
+    features.append({"type": "Feature", "properties": props, "geometry": g})
+  return {"type": "FeatureCollection", "features": features}
+
+BUFFER_MAX_DISTANCES = 32        # Puffer-Distanzen je Aufruf
+BUFFER_MAX_M = 100000.0          # |Distanz| in Metern
+BUFFER_JOINS = {"round": 1, "mitre": 2, "bevel": 3}
+
+def polygon_geometries(rings: dict, xy=None):
+  """Flache Ringe (flatten_polygons) -> ein shapely-MultiPolygon je Polygon-Feature.
+
+  Liefert (Feature-Indizes, Geometrien); Ringe mit < 3 Punkten entfallen,
+  bei degenerierter Außenhülle das ganze Polygon (Löcher werden nie zu Flächen).
+  """
+  import numpy as np
+  import shapely
+  xy = rings["xy"] if xy is None else xy
+  off = rings["ring_off"]
+  cnt = np.diff(off)
+  closed = (xy[off[:-1]] == xy[np.maximum(off[1:] - 1, 0)]).all(axis=1)
+  keep = cnt + ~closed >= 4
+  ring_poly = rings["ring_poly"]
+  shell = np.concatenate([[True], ring_poly[1:] != ring_poly[:-1]]) if len(ring_poly) else ring_poly.astype(bool)
+  keep &= ~np.isin(ring_poly, ring_poly[shell & ~keep])
+  ring_ids = np.repeat(np.arange(int(keep.sum())), cnt[keep])
+  lr = shapely.linearrings(xy[np.repeat(keep, cnt)], indices=ring_ids)
+  upoly, poly_ids = np.unique(rings["ring_poly"][keep], return_inverse=True)
+  polys = shapely.polygons(lr, indices=poly_ids)
+  ufeat, feat_ids = np.unique(rings["poly_feat"][upoly], return_inverse=True)
+  return ufeat, shapely.multipolygons(polys, indices=feat_ids)
+
+def polygon_coordinates(geoms) -> list:
+  """shapely-(Multi)Polygone -> GeoJSON-Geometrien (None für leere), Listen je Ring statt je Punkt."""
+  import numpy as np
+  import shapely
+  parts, part_of = shapely.get_parts(geoms, return_index=True)
+  ring_arr, ring_of = shapely.get_rings(parts, return_index=True)
+  xy, coord_of = shapely.get_coordinates(ring_arr, return_index=True)
+  ends = np.cumsum(np.bincount(coord_of, minlength=len(ring_arr))).tolist()
+  pts = xy.tolist()
+  polys = [[] for _ in range(len(parts))]
+  for a, b, p in zip([0] + ends[:-1], ends, ring_of.tolist()):
+    polys[p].append(pts[a:b])
+  out = [[] for _ in range(len(geoms))]
+  for poly, g in zip(polys, part_of.tolist()):
+    out[g].append(poly)
+  return [None if not ps else
+          {"type": "Polygon", "coordinates": ps[0]} if len(ps) == 1 else
+          {"type": "MultiPolygon", "coordinates": ps} for ps in out]
+
+def buffer_fc(fc: dict, distances, join: str = "round", quad_segs: int = 8,
+              mitre_limit: float = 5.0, dissolve: bool = False) -> dict:
+  """Metrischer Puffer (positiv/negativ) in der AUTO_UTM-Zone, Ergebnis in EPSG:4326.
+
+  Ringe flach einlesen, projizieren und reparieren passiert einmal für alle
+  Distanzen; shapely.buffer läuft über das (Distanzen × Features)-Array in
+  GEOS, die Rückprojektion vektorisiert über alle Koordinaten.
+  """
+  import numpy as np
+  import shapely
+
+  rings = flatten_polygons(fc)
+  dist = np.asarray(distances, dtype=float)
+  if not len(rings["xy"]) or not dist.size:
+    return {"type": "FeatureCollection", "features": []}
+  lon = rings["xy"][:, 0]
+  utm = pick_auto_utm((lon.min() + lon.max()) / 2)
+  tm = _utm(utm)
+
+  x, y = tm.forward(rings["xy"][:, 0], rings["xy"][:, 1])
+  idx, geoms = polygon_geometries(rings, np.column_stack([x, y]))
+  geoms = shapely.make_valid(geoms)
+  for j in np.flatnonzero(~np.isin(shapely.get_type_id(geoms), (3, 6))):
+    geoms[j] = _polygonal(geoms[j]) or shapely.Polygon()   # make_valid may leave line/point debris
+  feats = fc.get("features") or []
+  props = [feats[i].get("properties") or {} for i in idx.tolist()]
+  if dissolve:
+    geoms = np.array([shapely.union_all(geoms)], dtype=object)
+    props = [{"dissolved": len(props)}]
+
+  out = shapely.buffer(geoms[None, :], dist[:, None], quad_segs=quad_segs,
+                       join_style=BUFFER_JOINS[join], mitre_limit=mitre_limit)
+  out = shapely.transform(out.ravel(), lambda a: np.column_stack(tm.inverse(a[:, 0], a[:, 1])))
+
+  features = []
+  for k, g in enumerate(polygon_coordinates(out)):
+    if g is None:
+      continue
+    d = float(dist[k // len(props)])
+    p = {**props[k % len(props)], "epsg": 4326, "buffer_m": d, "buffer_crs": utm}
+    features.append({"type": "Feature", "properties": p, "geometry": g})
+  return {"type": "FeatureCollection", "features": features}
+
+@warmup("geometry")
+def _warm_geometry() -> None:
+  dissolve_fc({"features": [{"geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]}}]})
+
+@app.post("/api/dissolve")
+@route_class("heavy")
+def dissolve():
+  by, indent = request.args.get("by") or None, _pretty_indent()
+
+  def build() -> bytes:
+    fc = _request_fc()
+    if fc is None:
+      raise ValueError("Erwarte GeoJSON FeatureCollection.")
+    return dumps_geojson(dissolve_fc(fc, by), 6, indent).encode()
+
+  try:
+    data = shared_payload("dissolve", request.get_data(), build, by, indent)
+  except ValueError as e:
+    return _bad_request(str(e))
+  return Response(data, mimetype="application/geo+json")
+
+@app.post("/api/buffer")
+@route_class("heavy")
+def buffer():
+  args = request.args
+  crs, join, indent = args.get("crs", "EPSG:4326"), args.get("join", "round"), _pretty_indent()
+  dissolve = args.get("dissolve") in ("1", "true")
+  try:
+    distances = tuple(float(d) for d in (args.get("distance") or "").split(",") if d.strip())
+    quad_segs = int(args.get("quad_segs", "8"))
+    mitre_limit = float(args.get("mitre_limit", "5"))
+  except ValueError:
+    return _bad_request("distance, quad_segs und mitre_limit müssen Zahlen sein.")
+  if not distances or len(distances) > BUFFER_MAX_DISTANCES:
+    return _bad_request(f"distance: 1 bis {BUFFER_MAX_DISTANCES} Werte (Meter, kommagetrennt).")
+  if any(not abs(d) <= BUFFER_MAX_M for d in distances):
+    return _bad_request(f"distance: höchstens {BUFFER_MAX_M:g} m.")
+  if join not in BUFFER_JOINS:
+    return _bad_request("join: round, mitre oder bevel.")
+  if not 1 <= quad_segs <= 64 or not mitre_limit > 0:
+    return _bad_request("quad_segs: 1–64, mitre_limit > 0.")
+  if crs not in EXPORT_CRS and crs != "AUTO_UTM":
+    return _bad_request(f"Nicht unterstütztes CRS: {crs}")
+
+  def build() -> bytes:
+    fc = _request_fc()
+    if fc is None:
+      raise ValueError("Erwarte GeoJSON FeatureCollection.")
+    out = buffer_fc(fc, distances, join, quad_segs, mitre_limit, dissolve)
+    epsg = resolve_crs(crs, fc)
+    if epsg == "EPSG:4326":
+      return dumps_geojson(out, 6, indent).encode()
+    return dumps_geojson(transform_fc(out, epsg), 2, indent).encode()
+
+  try:
+    data = shared_payload("buffer", request.get_data(), build,
+                          distances, join, quad_segs, mitre_limit, dissolve, crs, indent)
+  except ValueError as e:
+    return _bad_request(str(e))
+  return Response(data, mimetype="application/geo+json")
+
+@app.post("/api/cover")
+@route_class("heavy")
+def cover():
+  import json
+  from flask import stream_with_context
+  fc = _request_fc()
+  if fc is None:
+    return _bad_request("Erwarte GeoJSON FeatureCollection.")
+  try:
+    grid = _parse_grid(request.args, fc)
+    interior, boundary, decode = cover_cells(fc, grid)
+  except ValueError as e:
+    return _bad_request(str(e))
+  split = request.args.get("split") in ("1", "true")
+
+  def generate():
+    head = {"ok": True, "grid": grid}
+    yield json.dumps(head)[:-1]
+    if split:
+      yield f', "counts": {{"interior": {len(interior)}, "boundary": {len(boundary)}}}, "interior": ['
+      yield from _stream_ids(interior, decode, grid)
+      yield '], "boundary": ['
+      yield from _stream_ids(boundary, decode, grid)
+    else:
+      import numpy as np
+      cells = sorted_unique(np.concatenate([interior, boundary]))
+      yield f', "count": {len(cells)}, "cells": ['
+      yield from _stream_ids(cells, decode, grid)
+    yield "]}"
+
+  return streamed(Response(stream_with_context(generate()), mimetype="application/json"))
+
+@app.post("/api/rasterize")
+@route_class("heavy")
+def rasterize():
+  from flask import stream_with_context
+  fc = _request_fc()
+  if fc is None:
+    return _bad_request("Erwarte GeoJSON FeatureCollection.")
+  args = request.args
+  fmt = args.get("format", "raw")
+  try:
+    crs = resolve_crs(args.get("crs", "AUTO_UTM"), fc)
+    if crs not in EXPORT_CRS:
+      raise ValueError(f"Nicht unterstütztes CRS: {crs}")
+    res = float(args.get("res", "10"))
+    origin = tuple(float(v) for v in args.get("origin", "0,0").split(","))
+    if not res > 0 or len(origin) != 2:
+      raise ValueError("res muss > 0 sein, origin = x,y.")
+    if fmt not in ("raw", "npy", "tiff"):
+      raise ValueError("format muss raw, npy oder tiff sein.")
+    grid = raster_grid(fc, crs, res, origin)
+  except ValueError as e:
+    return _bad_request(str(e))
+
+  w, h = grid["width"], grid["height"]
+  row_bytes = (w + 7) // 8
+  tile_rows = max(1, min(h, RASTER_TILE_PIXELS // w))
+  head = {"raw": b"", "npy": npy_header((h, row_bytes)), "tiff": geotiff_header(grid, tile_rows)}[fmt]
+
+  def generate():
+    yield head
+    for block in raster_rows(grid, tile_rows):
+      yield block.tobytes()
+
+  resp = Response(stream_with_context(generate()), mimetype="image/tiff" if fmt == "tiff" else "application/octet-stream")
+  resp.headers["Content-Length"] = str(len(head) + h * row_bytes)
+  resp.headers["Content-Disposition"] = f'attachment; filename="aoi_mask_epsg{crs.split(":")[1]}_{res:g}.{fmt if fmt != "raw" else "bin"}"'
+  meta = {
+    "X-Raster-Width": w, "X-Raster-Height": h, "X-Raster-Row-Bytes": row_bytes, "X-Raster-CRS": crs,
+    "X-Raster-GeoTransform": ",".join(js_number(v) for v in grid["geotransform"]),
+  }
+  for k, v in meta.items():
+    resp.headers[k] = str(v)
+  resp.headers["Access-Control-Expose-Headers"] = ", ".join(meta)
+  return streamed(resp)
+
+@app.post("/api/topojson")
+@route_class("heavy")
+def topojson():
+  crs, dissolve = request.args.get("crs", "EPSG:4326"), request.args.get("dissolve") in ("1", "true")
+
+  def build() -> bytes:
+    fc = _request_fc()
+    if fc is None:
+      raise ValueError("Erwarte GeoJSON FeatureCollection.")
+    return export_fc(fc, crs, "TopoJSON", dissolve=dissolve)["text"].encode()
+
+  try:
+    data = shared_payload("topojson", request.get_data(), build, crs, dissolve)
+  except ValueError as e:
+    return _bad_request(str(e))
+  return Response(data, mimetype="application/json")
+
+@app.post("/api/contains")
+@route_class("heavy")
+def contains():
+  import json
+  import numpy as np
+  crs = request.args.get("crs", "EPSG:4326")
+  if crs not in EXPORT_CRS:
+    return _bad_request(f"Nicht unterstütztes CRS: {crs}")
+  fc, key, points = None, request.args.get("index"), None
+  try:
+    if request.mimetype == "multipart/form-data":
+      aoi = request.files.get("aoi")
+      fc = json.loads(aoi.read() if aoi else request.form.get("aoi", "null"))
+      if fc is not None:
+        fc = _as_fc(fc)
+        if fc is None:
+          return _bad_request("Feld 'aoi': erwarte GeoJSON FeatureCollection.")
+      pf = request.files.get("points")
+      if pf is None:
+        return _bad_request("Multipart-Feld 'points' fehlt.")
+      points = parse_points(pf.read(), pf.mimetype)
+    elif request.mimetype == "application/json":
+      body = request.get_json(silent=True)
+      if isinstance(body, list):
+        body = {"points": body}
+      if not isinstance(body, dict):
+        return _bad_request('Erwarte JSON {"aoi": FC, "points": [...]} oder ein Punkt-Array.')
+      if body.get("aoi") is not None:
+        fc = _as_fc(body["aoi"])
+        if fc is None:
+          return _bad_request("Feld 'aoi': erwarte GeoJSON FeatureCollection.")
+      key = body.get("index", key)
+      if key is not None and not isinstance(key, str):
+        return _bad_request("Feld 'index' muss ein String sein.")
+      points = parse_points(body.get("points") or [], "application/json")
+    else:
+      points = parse_points(request.get_data(), request.mimetype)
+  except (ValueError, TypeError) as e:
+    return _bad_request(f"Punkte/AOI nicht lesbar: {e}")
+
+  if fc is None and not key:
+    return _bad_request("AOI fehlt (Feld 'aoi' oder ?index=<hash>).")
+  try:
+    key, prep = prepared_aoi(fc, key, crs)
+  except ValueError as e:
+    return _bad_request(str(e))
+  if prep is None:
+    return _bad_request("Index unbekannt oder abgelaufen, AOI erneut senden.", 404)
+
+  hits = prep.lookup(*points)
+  if request.accept_mimetypes.best == "application/octet-stream":
+    resp = Response(hits.astype("<i4").tobytes(), mimetype="application/octet-stream")
+    resp.headers["X-AOI-Index"] = key
+    return resp
+  body = '{"ok": true, "index": "%s", "count": %d, "matched": %d, "feature": [%s]}' % (
+    key, len(hits), int(np.count_nonzero(hits >= 0)), ",".join(map(str, hits.tolist())))
+  return Response(body, mimetype="application/json")
+
+# ---- Permalinks (compact AOI codes, no storage)
+AOI_CODE_VERSION = 1
+AOI_CODE_Q = 1e6                                                        # 1e-6° wie roundPair
+AOI_CODE_MAX = int(os.getenv("AOI_CODE_MAX", "262144"))                 # Zeichen je Code
+AOI_CODE_MAX_BYTES = 16 * 1024 * 1024                                   # entpackt
+
+def _varint_bytes(v) -> bytes:
+  """uint64-Array -> LEB128-Varints, je Byte-Stelle ein vektorisierter Schritt."""
+  import numpy as np
+  v = np.asarray(v, dtype=np.uint64)
+  n = np.ones(len(v), dtype=np.int64)
+  k = 7
+  while k < 64 and (v >> np.uint64(k)).any():
+    n += (v >> np.uint64(k)) > 0
+    k += 7
+  off = np.cumsum(n) - n
+  out = np.empty(int(n.sum()), dtype=np.uint8)
+  for k in range(int(n.max()) if len(n) else 0):
+    m = n > k
+    byte = (v[m] >> np.uint64(7 * k)) & np.uint64(0x7F)
+    out[off[m] + k] = byte | np.where(n[m] > k + 1, 0x80, 0).astype(np.uint64)
+  return out.tobytes()
+
+def _varints(buf: bytes):
+  """LEB128-Varints -> uint64-Array (np.add.reduceat über die Byte-Gruppen)."""
+  import numpy as np
+  b = np.frombuffer(buf, dtype=np.uint8)
+  if not len(b):
+    return np.zeros(0, dtype=np.uint64)
+  ends = np.flatnonzero(b < 0x80)
+  if not len(ends) or ends[-1] != len(b) - 1:
+    raise ValueError("Varint abgeschnitten.")
+  starts = np.concatenate([[0], ends[:-1] + 1])
+  if (ends - starts).max() > 9:
+    raise ValueError("Varint zu lang.")
+  shift = (np.arange(len(b)) - np.repeat(starts, ends - starts + 1)) * 7
+  return np.add.reduceat((b & 0x7F).astype(np.uint64) << shift.astype(np.uint64), starts)
+
+def encode_aoi(fc: dict) -> str:
+  """FC -> Permalink-Code (wie encodeAoi im Browser).
+
+  Varints: Version, #Features, Polygone je Feature, Ringe je Polygon, Punkte
+  je Ring (ohne Schlusspunkt), danach zigzag-Deltas der auf 1e-6° gerundeten
+  x/y; raw deflate, base64url ohne Padding.
+  """
+  import base64
+  import zlib
+  import numpy as np
+  rings = flatten_polygons(fc)
+  ufeat, poly_feat = np.unique(rings["poly_feat"], return_inverse=True)
+  off = rings["ring_off"]
+  q = np.floor(rings["xy"] * AOI_CODE_Q + 0.5).astype(np.int64)
+  starts, lasts = off[:-1], off[1:] - 1
+  closed = (q[starts] == q[lasts]).all(axis=1) & (lasts > starts)
+  keep = np.ones(len(q), dtype=bool)
+  keep[lasts[closed]] = False
+  q = q[keep]
+  d = np.diff(q, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+  counts = np.concatenate([
+    [AOI_CODE_VERSION, len(ufeat)],
+    np.bincount(poly_feat, minlength=len(ufeat)),
+    np.bincount(rings["ring_poly"], minlength=len(poly_feat)),
+    np.diff(off) - closed,
+  ]).astype(np.uint64)
+  zz = ((d << 1) ^ (d >> 63)).astype(np.uint64)
+  raw = _varint_bytes(np.concatenate([counts, zz]))
+  comp = zlib.compressobj(9, zlib.DEFLATED, -15)
+  return base64.urlsafe_b64encode(comp.compress(raw) + comp.flush()).rstrip(b"=").decode("ascii")
+
+def decode_aoi(code: str) -> dict:
+  """Permalink-Code -> FeatureCollection (EPSG:4326, Ringe geschlossen); ValueError bei Unsinn."""
+  import base64
+  import binascii
+  import zlib
+  import numpy as np
+  code = (code or "").strip()
+  if not code or len(code) > AOI_CODE_MAX:
+    raise ValueError(f"AOI-Code fehlt oder ist länger als {AOI_CODE_MAX} Zeichen.")
+  try:
+    comp = base64.urlsafe_b64decode(code + "=" * (-len(code) % 4))
+    dec = zlib.decompressobj(-15)
+    raw = dec.decompress(comp, AOI_CODE_MAX_BYTES)
+  except (binascii.Error, zlib.error) as e:
+    raise ValueError(f"AOI-Code nicht lesbar: {e}")
+  if dec.unconsumed_tail:
+    raise ValueError("AOI-Code entpackt zu groß.")
+
+  v = _varints(raw)
+  if len(v) < 2 or int(v[0]) != AOI_CODE_VERSION:
+    raise ValueError("AOI-Code: unbekannte Version.")
+  nf = int(v[1])
+  pos = 2
+  sections = []
+  for n in (nf, None, None):
+    n = n if n is not None else int(sections[-1].sum())
+    if n < 0 or pos + n > len(v):
+      raise ValueError("AOI-Code abgeschnitten.")
+    sections.append(v[pos:pos + n].astype(np.int64))
+    pos += n
+  polys, rings, pts = sections
+  npts = int(pts.sum())
+  if len(v) - pos != 2 * npts:
+    raise ValueError("AOI-Code: Koordinatenzahl passt nicht.")
+  zz = v[pos:]
+  d = (zz >> np.uint64(1)).astype(np.int64) ^ -(zz & np.uint64(1)).astype(np.int64)
+  xy = (np.cumsum(d.reshape(-1, 2), axis=0) / AOI_CODE_Q).tolist()
+
+  # nested lists per ring (slices of one tolist), ring closed again
+  features, p, r, c = [], 0, 0, 0
+  polys, rings, pts = polys.tolist(), rings.tolist(), pts.tolist()
+  for n_poly in polys:
+    coords = []
+    for nr in rings[p:p + n_poly]:
+      poly = []
+      for n in pts[r:r + nr]:
+        ring = xy[c:c + n]
+        if ring:
+          ring.append(ring[0])
+        poly.append(ring)
+        c += n
+      r += nr
+      coords.append(poly)
+    p += n_poly
+    geom = {"type": "Polygon", "coordinates": coords[0]} if len(coords) == 1 else \
+           {"type": "MultiPolygon", "coordinates": coords}
+    features.append({"type": "Feature", "properties": {}, "geometry": geom})
+  return {"type": "FeatureCollection", "features": features}
+
+@app.post("/api/encode")
+@route_class("light")
+def encode():
+  fc = _request_fc()
+  if fc is None:
+    return _bad_request("Erwarte GeoJSON FeatureCollection.")
+  try:
+    code = encode_aoi(fc)
+  except ValueError as e:
+    return _bad_request(str(e))
+  return jsonify({"ok": True, "aoi": code, "chars": len(code), "url": f"{request.host_url}#aoi={code}"})
+
+@app.get("/api/decode")
+@route_class("light")
+def decode():
+  args = request.args
+  fmt, crs = args.get("format", "GeoJSON"), args.get("crs", "EPSG:4326")
+  try:
+    res = export_fc(decode_aoi(args.get("aoi")), crs, fmt, dissolve=args.get("dissolve") in ("1", "true"))
+  except ValueError as e:
+    return _bad_request(str(e))
+  resp = Response(res["text"], mimetype=res["mimetype"])
+  if args.get("download") in ("1", "true"):
+    resp.headers["Content-Disposition"] = f'attachment; filename="{res["filename"]}"'
+  # output is a pure function of the URL
+  resp.headers["Cache-Control"] = "public, max-age=86400"
+  return resp
+
+# ---- Export jobs (process pool, spool directory)
+_JOB_POOL = None
+_JOB_POOL_LOCK = threading.Lock()
+_JOB_ACTIVE = set()
+_JOB_SWEEP = {"last": 0.0}
+
+def _job_path(job_id: str, suffix: str) -> str:
+  return os.path.join(JOB_SPOOL_DIR, f"{job_id}.{suffix}")
+
+def _job_write(job_id: str, status: dict) -> None:
+  import json
+  tmp = _job_path(job_id, f"json.{os.getpid()}.tmp")
+  with open(tmp, "w", encoding="utf-8") as fh:
+    json.dump(status, fh)
+  os.replace(tmp, _job_path(job_id, "json"))
+
+def _job_read(job_id: str):
+  import json
+  try:
+    with open(_job_path(job_id, "json"), encoding="utf-8") as fh:
+      return json.load(fh)
+  except (OSError, ValueError):
+    return None
+
+def run_export_job(job_id: str, spec: dict) -> None:
+  """Läuft im Worker-Prozess: Export in die Spool-Datei, Fortschritt in <id>.json."""
+  status = _job_read(job_id) or {"id": job_id}
+  status.update(status="running", started=time.time())
+  fc = spec["aoi"]
+  status["progress"] = {
+    "features_done": 0, "features_total": len(fc.get("features") or []),
+    "vertices_done": 0, "vertices_total": count_vertices(fc),
+  }
+  _job_write(job_id, status)
+  last = [0.0]
+
+  def progress(features_done: int, vertices_done: int) -> None:
+    status["progress"].update(features_done=features_done, vertices_done=vertices_done)
+    if time.monotonic() - last[0] > 0.5:
+      last[0] = time.monotonic()
+      _job_write(job_id, status)
+
+  tmp = _job_path(job_id, "result.tmp")
+  try:
+    with open(tmp, "w", encoding="utf-8") as fh:
+      meta = export_fc(fc, spec["crs"], spec["format"], spec["dissolve"], write=fh.write, progress=progress)
+    os.replace(tmp, _job_path(job_id, "result"))
+    meta.pop("text")
+    status.update(status="done", finished=time.time(), result={
+      **meta, "bytes": os.path.getsize(_job_path(job_id, "result"))})
+  except Exception as e:
+    status.update(status="error", finished=time.time(), error=str(e))
+    try:
+      os.remove(tmp)
+    except OSError:
+      pass
+  _job_write(job_id, status)
+
+def _job_pool():
+  global _JOB_POOL
+  with _JOB_POOL_LOCK:
+    if _JOB_POOL is None:
+      import multiprocessing
+      from concurrent.futures import ProcessPoolExecutor
+      _JOB_POOL = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _JOB_POOL
+
+def _job_done(job_id: str, fut) -> None:
+  with _JOB_POOL_LOCK:
+    _JOB_ACTIVE.discard(job_id)
+  if fut.exception() is not None:
+    status = _job_read(job_id) or {"id": job_id}
+    status.update(status="error", finished=time.time(), error=str(fut.exception()))
+    _job_write(job_id, status)
+
+def sweep_spool(force: bool = False) -> int:
+  """Löscht abgelaufene Jobs (TTL, hängende nach JOB_MAX_AGE) und älteste fertige
+  Ergebnisse über der Quota; gibt belegte Bytes inkl. halbfertiger .tmp zurück."""
+  now = time.time()
+  jobs, partial = [], {}
+  for entry in os.scandir(JOB_SPOOL_DIR) if os.path.isdir(JOB_SPOOL_DIR) else []:
+    if entry.name.endswith(".json"):
+      st = _job_read(entry.name[:-5])
+      if st:
+        jobs.append(st)
+    elif entry.name.endswith(".tmp"):
+      try:
+        partial[entry.path] = (entry.name.split(".", 1)[0], entry.stat())
+      except OSError:
+        pass
+  used = (sum(((j.get("result") or {}).get("bytes") or 0) for j in jobs)
+          + sum(st.st_size for _, st in partial.values()))
+  if not force and now - _JOB_SWEEP["last"] < 30:
+    return used
+  _JOB_SWEEP["last"] = now
+
+  def drop(job_id: str) -> None:
+    for suffix in ("result", "json"):
+      try:
+        os.remove(_job_path(job_id, suffix))
+      except OSError:
+        pass
+
+  with _JOB_POOL_LOCK:
+    active = set(_JOB_ACTIVE)
+  # queued/running past JOB_MAX_AGE: worker died or the owning process restarted
+  for j in jobs:
+    if not j.get("finished") and j.get("id") not in active and now - (j.get("created") or 0) > JOB_MAX_AGE:
+      drop(j["id"])
+  # partial outputs nobody has written to for JOB_MAX_AGE
+  for path, (job_id, st) in partial.items():
+    if job_id not in active and now - st.st_mtime > JOB_MAX_AGE:
+      try:
+        os.remove(path)
+        used -= st.st_size
+      except OSError:
+        pass
+
+  finished = sorted((j for j in jobs if j.get("finished")), key=lambda j: j["finished"])
+  for j in finished:
+    size = (j.get("result") or {}).get("bytes") or 0
+    if now - j["finished"] > JOB_TTL or used > JOB_SPOOL_MAX_MB * 1024 * 1024:
+      drop(j["id"])
+      used -= size
+  return used
+
+@app.post("/api/jobs")
+@route_class("light")
+def job_submit():
+  import uuid
+  body = request.get_json(silent=True)
+  fc = body.get("aoi") if isinstance(body, dict) else None
+  if not isinstance(fc, dict) or not isinstance(fc.get("features"), list):
+    return _bad_request("Erwarte {\"aoi\": FeatureCollection, …}.")
+  spec = {
+    "aoi": fc,
+    "crs": body.get("crs", "EPSG:4326"),
+    "format": body.get("format", "GeoJSON"),
+    "dissolve": bool(body.get("dissolve")),
+  }
+  if spec["format"] not in EXPORT_FORMATS:
+    return _bad_request(f"Unbekanntes Format: {spec['format']}")
+  if spec["crs"] != "AUTO_UTM" and spec["crs"] not in EXPORT_CRS:
+    return _bad_request(f"Nicht unterstütztes CRS: {spec['crs']}")
+
+  os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+  if sweep_spool() > JOB_SPOOL_MAX_MB * 1024 * 1024 and sweep_spool(force=True) > JOB_SPOOL_MAX_MB * 1024 * 1024:
+    resp = _bad_request("Spool-Quota erschöpft, bitte später erneut versuchen.", 503)
+    resp.headers["Retry-After"] = "60"
+    return resp
+  with _JOB_POOL_LOCK:
+    if len(_JOB_ACTIVE) >= JOB_QUEUE_MAX:
+      resp = _bad_request("Job-Queue voll, bitte später erneut versuchen.", 503)
+      resp.headers["Retry-After"] = str(ADMISSION_RETRY_AFTER)
+      return resp
+    job_id = uuid.uuid4().hex
+    _JOB_ACTIVE.add(job_id)
+
+  _job_write(job_id, {
+    "id": job_id, "status": "queued", "created": time.time(),
+    "format": spec["format"], "crs": spec["crs"], "dissolve": spec["dissolve"],
+  })
+  try:
+    fut = _job_pool().submit(run_export_job, job_id, spec)
+  except RuntimeError:
+    # BrokenProcessPool (a worker died, e.g. OOM): start a fresh pool once
+    global _JOB_POOL
+    with _JOB_POOL_LOCK:
+      _JOB_POOL = None
+    fut = _job_pool().submit(run_export_job, job_id, spec)
+  fut.add_done_callback(lambda f: _job_done(job_id, f))
+  resp = jsonify({"ok": True, "id": job_id, "status": "queued", "href": f"/api/jobs/{job_id}"})
+  resp.status_code = 202
+  resp.headers["Location"] = f"/api/jobs/{job_id}"
+  return resp
+
+def _job_or_404(job_id: str):
+  if len(job_id) != 32 or any(c not in "0123456789abcdef" for c in job_id):
+    return None
+  return _job_read(job_id)
+
+@app.get("/api/jobs/<job_id>")
+@route_class("light")
+def job_status(job_id: str):
+  status = _job_or_404(job_id)
+  if status is None:
+    return _bad_request("Job unbekannt oder abgelaufen.", 404)
+  if status["status"] == "done":
+    status["href"] = f"/api/jobs/{job_id}/result"
+    status["expires"] = status["finished"] + JOB_TTL
+  return jsonify({"ok": True, **status})
+
+@app.get("/api/jobs/<job_id>/result")
+@route_class("light")
+def job_result(job_id: str):
+  from flask import send_file
+  status = _job_or_404(job_id)
+  if status is None:
+    return _bad_request("Job unbekannt oder abgelaufen.", 404)
+  if status["status"] != "done":
+    return _bad_request(f"Job noch nicht fertig ({status['status']}).", 409)
+  res = status["result"]
+  return send_file(_job_path(job_id, "result"), mimetype=res["mimetype"], as_attachment=True,
+                   download_name=res["filename"], conditional=True, max_age=JOB_TTL)
+
+# ---- Command line: batch export without HTTP
+def _kml_features(fh):
+  """Placemarks mit (Multi)Polygonen aus KML, streamend (iterparse)."""
+  import xml.etree.ElementTree as ET
+
+  def local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+  def ring(el):
+    pts = []
+    for c in el.iter():
+      if local(c.tag) == "coordinates" and c.text:
+        for tok in c.text.split():
+          v = tok.split(",")
+          pts.append([float(v[0]), float(v[1])])
+    return pts
+
+  def polygon(el):
+    outer = [ring(c) for c in el if local(c.tag) == "outerBoundaryIs"]
+    inner = [ring(c) for c in el if local(c.tag) == "innerBoundaryIs"]
+    return outer[:1] + inner
+
+  for _, el in ET.iterparse(fh, events=("end",)):
+    if local(el.tag) != "Placemark":
+      continue
+    name = next((c.text for c in el if local(c.tag) == "name"), None)
+    polys = [polygon(c) for c in el.iter() if local(c.tag) == "Polygon"]
+    el.clear()
+    if not polys:
+      continue
+    geom = {"type": "Polygon", "coordinates": polys[0]} if len(polys) == 1 else \
+      {"type": "MultiPolygon", "coordinates": polys}
+    yield {"type": "Feature", "properties": {"name": name} if name else {}, "geometry": geom}
+
+def _seq_first_line(head: bytes) -> bool:
+  """GeoJSONSeq, wenn schon die erste Zeile ein vollständiges JSON-Objekt ist (pretty-printed GeoJSON nie)."""
+  import json
+  line, sep, rest = head.lstrip().partition(b"\n")
+  if not sep or not rest.strip():
+    return False
+  try:
+    return isinstance(json.loads(line), dict)
+  except ValueError:
+    return False
+
+def read_features(path: str, fmt: str = "auto"):
+  """Features aus GeoJSON, GeoJSONSeq (RFC 8142 / eine Zeile je Feature) oder KML."""
+  import io
+  import json
+  fh = sys.stdin.buffer if path == "-" else open(path, "rb")
+  try:
+    if fmt == "auto":
+      ext = os.path.splitext(path)[1].lower()
+      if ext == ".kml":
+        fmt = "kml"
+      elif ext in (".geojsonl", ".geojsons", ".geojsonseq", ".jsonl", ".ndjson"):
+        fmt = "geojsonseq"
+      else:
+        head = fh.peek(1 << 16)[:1 << 16] if hasattr(fh, "peek") else b""
+        first = head.lstrip()[:1]
+        if first == b"<":
+          fmt = "kml"
+        elif first == b"\x1e" or _seq_first_line(head):
+          fmt = "geojsonseq"
+        else:
+          fmt = "geojson"
+    if fmt == "kml":
+      yield from _kml_features(fh)
+      return
+    docs = (json.loads(line.lstrip(b"\x1e")) for line in fh if line.strip(b"\x1e \t\r\n")) \
+      if fmt == "geojsonseq" else [json.load(io.TextIOWrapper(fh, encoding="utf-8"))]
+    for doc in docs:
+      if isinstance(doc, dict) and doc.get("type") == "FeatureCollection":
+        yield from doc.get("features") or []
+      else:
+        yield doc
+  finally:
+    if fh is not sys.stdin.buffer:
+      fh.close()
+
+def _chunked(it, n: int):
+  part = []
+  for x in it:
+    part.append(x)
+    if len(part) >= n:
+      yield part
+      part = []
+  if part:
+    yield part
+
+def _cli_chunk(features: list, epsg: str, fmt: str):
+  return export_chunk(features, epsg, fmt), len(features), count_vertices({"features": features})
+
+def _ordered_map(fn, items, workers: int, *args):
+  """fn(item, *args) über einen Prozess-Pool, Ergebnisse in Eingabereihenfolge,
+  höchstens 2 * workers Stücke gleichzeitig unterwegs (begrenzter Speicher)."""
+  if workers <= 1:
+    for it in items:
+      yield fn(it, *args)
+    return
+  from collections import deque
+  from concurrent.futures import ProcessPoolExecutor
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    window = deque()
+    for it in items:
+      window.append(pool.submit(fn, it, *args))
+      if len(window) >= 2 * workers:
+        yield window.popleft().result()
+    while window:
+      yield window.popleft().result()
+
+def cli_export(args) -> int:
+  import resource
+  t0 = time.perf_counter()
+  inputs = args.inputs or ["-"]
+  fmt = args.format or {
+    ".wkt": "WKT", ".ewkt": "EWKT", ".kml": "KML", ".topojson": "TopoJSON",
+  }.get(os.path.splitext(args.output or "")[1].lower(), "GeoJSON")
+
+  def features():
+    for path in inputs:
+      yield from read_features(path, args.input_format)
+
+  out = sys.stdout if args.output in (None, "-") else open(args.output, "w", encoding="utf-8", newline="")
+  written = [0]
+
+  def write(text: str) -> None:
+    out.write(text)
+    written[0] += len(text)
+
+  n_feat = n_vert = 0
+  try:
+    if fmt == "TopoJSON" or args.dissolve:
+      # shared arcs / union need the whole collection at once
+      fc = {"type": "FeatureCollection", "features": list(features())}
+      n_feat, n_vert = len(fc["features"]), count_vertices(fc)
+      epsg = export_fc(fc, args.crs, fmt, args.dissolve, write=write)["epsg"]
+    else:
+      if args.crs == "AUTO_UTM":
+        # zone from the bounds of all AOIs: extra pass (or buffer stdin)
+        if "-" in inputs:
+          feats = list(features())
+          source = lambda: iter(feats)
+        else:
+          source = features
+        lo = [float("inf")] * 2
+        hi = [float("-inf")] * 2
+        for part in _chunked(source(), EXPORT_CHUNK):
+          b = fc_bounds({"features": part})
+          if b:
+            lo = [min(lo[0], b[0]), min(lo[1], b[1])]
+            hi = [max(hi[0], b[2]), max(hi[1], b[3])]
+        epsg = pick_auto_utm((lo[0] + hi[0]) / 2) if lo[0] <= hi[0] else "EPSG:25832"
+      else:
+        source = features
+        epsg = args.crs
+      writer = ExportWriter(epsg, fmt, write)
+      for part, nf, nv in _ordered_map(_cli_chunk, _chunked(source(), args.chunk), args.workers, epsg, fmt):
+        writer.add(part)
+        n_feat += nf
+        n_vert += nv
+      writer.close()
+  finally:
+    if out is not sys.stdout:
+      out.close()
+    else:
+      out.flush()
+
+  dt = time.perf_counter() - t0
+  rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+  print(f"[export] {fmt} {epsg}: {n_feat} features, {n_vert} vertices, {written[0] / 1e6:.1f} MB "
+        f"in {dt:.2f} s ({n_feat / dt:.0f} features/s, {n_vert / dt:.0f} vertices/s), "
+        f"peak RSS {rss / 1024:.0f} MB, workers {max(args.workers, 1)}", file=sys.stderr)
+  return 0
+
+def cli(argv: list) -> int:
+  import argparse
+  ap = argparse.ArgumentParser(prog="main.py", description="AOI Studio – Server oder Batch-Export.")
+  sub = ap.add_subparsers(dest="cmd")
+  sub.add_parser("serve", help="Webserver starten (Default, PORT env)")
+  ex = sub.add_parser("export", help="AOIs reprojizieren/exportieren (identisch zum Web-Export)")
+  ex.add_argument("inputs", nargs="*", help="GeoJSON/GeoJSONSeq/KML-Dateien, - = stdin (Default)")
+  ex.add_argument("-o", "--output", help="Ausgabedatei (Default: stdout)")
+  ex.add_argument("-f", "--format", choices=sorted(EXPORT_FORMATS), help="Default nach Endung von -o, sonst GeoJSON")
+  ex.add_argument("--crs", default="EPSG:4326", choices=["AUTO_UTM", *EXPORT_CRS])
+  ex.add_argument("--input-format", default="auto", choices=["auto", "geojson", "geojsonseq", "kml"])
+  ex.add_argument("--dissolve", action="store_true", help="Überlappende AOIs vereinigen (wie im Browser)")
+  ex.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+  ex.add_argument("--chunk", type=int, default=EXPORT_CHUNK, help="Features je Arbeitspaket")
+  args = ap.parse_args(argv)
+  if args.cmd == "export":
+    try:
+      return cli_export(args)
+    except (OSError, ValueError) as e:
+      print(f"[export] Fehler: {e}", file=sys.stderr)
+      return 1
+  if STARTUP_MODE == "eager":
+    startup()
+  app.run(host="0.0.0.0", port=int(os.getenv("PORT", "8080")), debug=False)
+  return 0
+
+STARTUP["import_ms"] = round((time.perf_counter() - _T0) * 1000, 3)
+print(f"[startup] import total: {STARTUP['import_ms']:.1f} ms", file=sys.stderr, flush=True)
+
 if __name__ == "__main__":
-  port = int(os.getenv("PORT", "8080"))
-  app.run(host="0.0.0.0", port=port, debug=False)
+  sys.exit(cli(sys.argv[1:]))
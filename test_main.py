@@ -0,0 +1,70 @@
+"""Smoke-Tests für main.py (pytest, Flask-Testclient)."""
+import pytest
+
+import main
+
+SQUARE = {"type": "FeatureCollection", "features": [{"type": "Feature", "properties": {}, "geometry": {
+  "type": "Polygon", "coordinates": [[[8.0, 49.0], [8.1, 49.0], [8.1, 49.1], [8.0, 49.1], [8.0, 49.0]]]}}]}
+
+@pytest.fixture
+def client():
+  return main.app.test_client()
+
+def test_rasterize_holds_heavy_slot_while_streaming(client):
+  gate = main.ADMISSION["heavy"]
+  resp = client.post("/api/rasterize?crs=EPSG:25832&res=5", json=SQUARE, buffered=False)
+  body = iter(resp.response)
+  next(body)
+  assert gate.active == 1
+  for _ in body:
+    assert gate.active == 1
+  resp.close()
+  assert gate.active == 0
+
+def test_cover_holds_heavy_slot_while_streaming(client):
+  gate = main.ADMISSION["heavy"]
+  resp = client.post("/api/cover?grid=utm&size=100&crs=EPSG:25832", json=SQUARE, buffered=False)
+  body = iter(resp.response)
+  next(body)
+  assert gate.active == 1
+  resp.close()
+  assert gate.active == 0
+
+def test_polygon_geometries_drops_polygon_with_degenerate_shell():
+  hole = [[2, 2], [3, 2], [3, 3], [2, 2]]
+  fc = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "properties": {}, "geometry": {"type": "MultiPolygon", "coordinates": [
+      [[[0, 0], [1, 1], [0, 0]], hole],                 # Hülle nach dem Schließen degeneriert
+      [[[0, 0], [1, 1]], hole],                         # Hülle < 3 Punkte
+      [SQUARE["features"][0]["geometry"]["coordinates"][0]],
+    ]}}]}
+  _, geoms = main.polygon_geometries(main.flatten_polygons(fc))
+  assert len(geoms) == 1 and len(geoms[0].geoms) == 1
+  assert geoms[0].bounds == (8.0, 49.0, 8.1, 49.1)
+
+def test_index_with_aoi_runs_under_light_admission():
+  with main.app.test_request_context("/?aoi=abc"):
+    assert main._request_route_class() == "light"
+  with main.app.test_request_context("/"):
+    assert main._request_route_class() == "static"
+
+def test_sweep_spool_expires_stuck_jobs_and_counts_partial_output(tmp_path, monkeypatch):
+  import os
+  import time
+  monkeypatch.setattr(main, "JOB_SPOOL_DIR", str(tmp_path))
+  old = time.time() - main.JOB_MAX_AGE - 60
+  main._job_write("stuck", {"id": "stuck", "status": "running", "created": old})
+  main._job_write("fresh", {"id": "fresh", "status": "running", "created": time.time()})
+  (tmp_path / "fresh.result.tmp").write_bytes(b"x" * 1000)
+  (tmp_path / "gone.result.tmp").write_bytes(b"x" * 500)
+  os.utime(tmp_path / "gone.result.tmp", (old, old))
+  assert main.sweep_spool(force=True) == 1000
+  assert sorted(os.listdir(tmp_path)) == ["fresh.json", "fresh.result.tmp"]
+
+def test_gzip_asset_has_its_own_etag(client):
+  plain = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+  gz = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+  assert gz.headers["Content-Encoding"] == "gzip"
+  assert gz.headers["ETag"] != plain.headers["ETag"]
+  assert client.get("/static/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": gz.headers["ETag"]}).status_code == 304
+  assert client.get("/static/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]}).status_code == 200